@@ -1,19 +1,168 @@
+import math
 import os
+import threading
+import time
 from functools import wraps
-from flask import Flask, render_template, request, send_from_directory, url_for, redirect, session, flash
-from werkzeug.utils import secure_filename
-from database1 import DatabaseManager, UserManager, CourseManager
+from werkzeug.local import LocalProxy
+from flask import Flask, render_template, request, url_for, redirect, session, flash, jsonify
+from database import AnalyticsManager, DatabaseManager, UserManager, CourseManager
+from instrumentation import RequestMetrics
+from maintenance import MaintenanceWorker
+from pagecache import PageCache
+from ratelimit import MemoryRateLimitStore, RateLimiter
+from uploads import ImageProcessor, UploadCache, save_upload, serve_upload
+from sessions import CachedSessionStore, ServerSideSessionInterface, SQLiteSessionStore
 
 # --- APP INITIALIZATION ---
 app = Flask(__name__)
 app.secret_key = 'a_very_secret_key_for_flash_messaging'  # Required for session and flash messages
 UPLOAD_FOLDER = "uploads"
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['COURSES_PER_PAGE'] = 12
+app.config['STUDENTS_PER_PAGE'] = 25
+# Seconds between polls of the catalog_version stamp, so course writes made by
+# one worker invalidate the catalog caches and search index of all the others.
+app.config['CATALOG_VERSION_CHECK_INTERVAL'] = 2
+app.config['UPLOAD_CACHE_BYTES'] = 32 * 1024 * 1024  # In-memory cache for small, frequently served uploads
+app.config['SESSION_DB_PATH'] = os.path.join(app.instance_path, "sessions.sqlite3")
+# Token buckets per client IP and per username: (attempts, period in seconds).
+app.config['RATE_LIMITS'] = {
+    'login_ip': (20, 60),
+    'login_username': (5, 300),
+    'reset_ip': (10, 60),
+    'reset_username': (3, 300),
+}
+app.config['MAINTENANCE_INTERVAL'] = 30  # Seconds between runs of the cross-database maintenance jobs
+# Read replicas as comma-separated host:port pairs, e.g. DB_REPLICAS=127.0.0.1:3307,127.0.0.1:3308
+app.config['DB_REPLICAS'] = [replica for replica in os.environ.get('DB_REPLICAS', '').split(',') if replica]
+
+# Session data (including the cart) lives server-side; the cookie only holds a signed session id.
+# Use MySQLSessionStore(db_manager) instead when workers run on more than one host.
+app.session_interface = ServerSideSessionInterface(CachedSessionStore(SQLiteSessionStore(app.config['SESSION_DB_PATH'])))
+
+# --- REQUEST INSTRUMENTATION (/metrics, Server-Timing, slow-request profiling) ---
+request_metrics = RequestMetrics(app)
+
+# --- LOGIN THROTTLING ---
+# Counts are per worker process; use SQLiteRateLimitStore(path) to share them
+# between all workers on a host.
+rate_limiter = RateLimiter(app.config['RATE_LIMITS'], MemoryRateLimitStore())
+request_metrics.add_collector(rate_limiter.samples)
 
 # --- DATABASE & MANAGER INITIALIZATION ---
-db_manager = DatabaseManager()
-user_manager = UserManager(db_manager)
-course_manager = CourseManager(db_manager)
+# Managers are built on first use, so importing the app (workers, CLI commands,
+# tests) opens no connections. The schema is created by `flask --app app init-db`,
+# never on startup.
+_managers = {}
+_managers_lock = threading.Lock()
+
+def _build_managers(db_manager, password_hasher):
+    request_metrics.watch_database(db_manager)
+    _managers.update(
+        db=db_manager,
+        users=UserManager(db_manager, password_hasher),
+        courses=CourseManager(db_manager, version_check_interval=app.config['CATALOG_VERSION_CHECK_INTERVAL']),
+        analytics=AnalyticsManager(db_manager),
+        maintenance=MaintenanceWorker(db_manager, interval=app.config['MAINTENANCE_INTERVAL']),
+    )
+
+def init_managers(db_manager=None, password_hasher=None):
+    """Creates the managers now, optionally around a given DatabaseManager; returns them by name."""
+    with _managers_lock:
+        _build_managers(db_manager or DatabaseManager(replicas=app.config['DB_REPLICAS']), password_hasher)
+    return dict(_managers)
+
+def _get_manager(name):
+    if not _managers:
+        with _managers_lock:
+            if not _managers:
+                _build_managers(DatabaseManager(replicas=app.config['DB_REPLICAS']), None)
+    return _managers[name]
+
+db_manager = LocalProxy(lambda: _get_manager('db'))
+user_manager = LocalProxy(lambda: _get_manager('users'))
+course_manager = LocalProxy(lambda: _get_manager('courses'))
+analytics_manager = LocalProxy(lambda: _get_manager('analytics'))
+maintenance_worker = LocalProxy(lambda: _get_manager('maintenance'))
+
+_warm_up_thread = None
+
+def start_warm_up():
+    """Opens pooled connections and checks the schema in a background thread, once per process.
+
+    Runs on the first request; call it from a server hook (e.g. gunicorn's
+    post_worker_init) to start it before any request arrives.
+    """
+    global _warm_up_thread
+    if _warm_up_thread is not None:
+        return
+    with _managers_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(target=_warm_up, name='db-warm-up', daemon=True)
+            _warm_up_thread.start()
+
+def _warm_up():
+    try:
+        db_manager.warm_up()
+        if not db_manager.schema_ready():
+            app.logger.warning("Database schema is missing or out of date; run `flask --app app init-db`.")
+        else:
+            maintenance_worker.start()
+    except Exception:
+        app.logger.exception("Database warm-up failed")
+
+app.before_request(start_warm_up)
+
+# A session that wrote recently keeps reading from the primary until the replicas
+# have caught up, so e.g. the profile page after user_save shows the new email.
+@app.before_request
+def route_reads():
+    if db_manager.replicas:
+        db_manager.start_request(read_primary=session.get('read_primary_until', 0) > time.time())
+
+@app.after_request
+def remember_writes(response):
+    if db_manager.replicas and db_manager.wrote_in_request():
+        session['read_primary_until'] = time.time() + db_manager.replica_stickiness
+    return response
+
+def replica_samples():
+    for replica in db_manager.replica_status():
+        labels = {'replica': f"{replica['host']}:{replica['port']}"}
+        yield "db_replica_healthy", labels, int(replica['healthy'])
+        yield "db_replica_failures_total", labels, replica['failures']
+        if replica['latency'] is not None:
+            yield "db_replica_ping_seconds", labels, replica['latency']
+
+request_metrics.add_collector(replica_samples)
+
+def catalog_cache_samples():
+    for key, value in course_manager.cache_stats().items():
+        if isinstance(value, (int, float)):
+            yield f"catalog_cache_{key}", {}, value
+
+request_metrics.add_collector(catalog_cache_samples)
+request_metrics.add_collector(lambda: maintenance_worker.samples())
+
+# Rendered home/course pages and the course grid fragment, dropped whenever the
+# catalog version changes (other workers' writes show up within
+# CATALOG_VERSION_CHECK_INTERVAL seconds).
+page_cache = PageCache(ttl=60)
+
+def page_cache_samples():
+    for key, value in page_cache.stats().items():
+        yield f"page_cache_{key}", {}, value
+
+request_metrics.add_collector(page_cache_samples)
+
+upload_cache = UploadCache(max_bytes=app.config['UPLOAD_CACHE_BYTES'])
+image_processor = ImageProcessor(app.config['UPLOAD_FOLDER'])
+
+def upload_cache_samples():
+    for key, value in upload_cache.stats().items():
+        yield f"upload_cache_{key}", {}, value
+
+request_metrics.add_collector(upload_cache_samples)
 
 # --- ADMIN CREDENTIALS ---
 ADMIN_USERNAME = "admin"
@@ -29,15 +178,47 @@ def basename_filter(path):
         return os.path.basename(path)
     return ''
 
+@app.template_filter('thumbnail')
+def thumbnail_filter(path, width):
+    """Jinja filter returning the filename of a resized variant of an image, or the original."""
+    return image_processor.variant_for(path, width)
+
 def save_image(file):
-    """Saves an uploaded file securely and returns its path."""
+    """Saves an uploaded file under its content hash, queues its thumbnails and returns its path."""
     if file and file.filename != '':
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        file_path = save_upload(file, app.config['UPLOAD_FOLDER'])
+        image_processor.submit(file_path)
         return file_path
     return None
 
+def get_cart():
+    """Returns the titles in the session cart, in the order they were added."""
+    return list(session.get('cart') or ())
+
+def _cart():
+    cart = session.get('cart')
+    if not isinstance(cart, dict):
+        cart = dict.fromkeys(cart or (), True)
+        session['cart'] = cart
+    return cart
+
+def add_to_cart(title):
+    """Adds title to the session cart; returns False if it was already there."""
+    cart = _cart()
+    if title in cart:
+        return False
+    cart[title] = True
+    session.modified = True
+    return True
+
+def remove_from_cart(title):
+    """Removes title from the session cart; returns False if it was not there."""
+    cart = _cart()
+    if cart.pop(title, None) is None:
+        return False
+    session.modified = True
+    return True
+
 def login_required(f):
     """Decorator to ensure a user is logged in."""
     @wraps(f)
@@ -48,6 +229,40 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def get_course_page():
+    """Returns the page of courses selected by the 'after'/'before' cursor query parameters."""
+    return course_manager.list_courses(
+        after=request.args.get('after', type=int),
+        before=request.args.get('before', type=int),
+        limit=app.config['COURSES_PER_PAGE']
+    )
+
+def throttle(action, username, template):
+    """Counts an attempt at action from this client and for this username.
+
+    Returns a 429 response rendering template once either has run out of
+    attempts, else None. Call it before touching the database so rejected
+    attempts cost no queries or password hashing.
+    """
+    retry_after = rate_limiter.check((f"{action}_ip", request.remote_addr),
+                                     (f"{action}_username", (username or '').strip().lower()))
+    if not retry_after:
+        return None
+    seconds = math.ceil(retry_after)
+    # Rendered directly rather than flashed, so a rejected attempt never writes the session store.
+    message = f"Too many attempts. Please try again in {seconds} seconds."
+    return render_template(template, error=message), 429, {'Retry-After': str(seconds)}
+
+def render_course_grid():
+    """Returns the markup for the selected page of the course grid, cached per catalog version."""
+    key = ('grid', request.args.get('after', type=int), request.args.get('before', type=int))
+
+    def render():
+        page = get_course_page()
+        return render_template("course_grid.html", courses=page['courses'], page=page)
+
+    return page_cache.fragment(key, course_manager.catalog_version(), render)
+
 def admin_required(f):
     """Decorator to ensure a user is an admin."""
     @wraps(f)
@@ -62,17 +277,23 @@ def admin_required(f):
 # --- AUTHENTICATION & CORE ROUTES ---
 
 @app.route("/", methods=["GET", "POST"])
+@page_cache.cached(
+    key=lambda: None if 'username' in session else
+        ('home', request.args.get('after', type=int), request.args.get('before', type=int)),
+    version=lambda: course_manager.catalog_version()
+)
 def home():
     if request.method == "POST":
-        search_input = request.form.get("searchcourse")
+        search_input = (request.form.get("searchcourse") or "").strip()
         course = course_manager.get_course(search_input)
         if course:
             return redirect(url_for("course_info", coursename=search_input))
-        else:
-            flash(f"Course '{search_input}' not found.", "warning")
+        results = course_manager.search_courses(search_input)
+        if results:
+            return render_template("home.html", courses=results, search=search_input)
+        flash(f"Course '{search_input}' not found.", "warning")
     
-    courses = course_manager.get_all_courses()
-    return render_template("home.html", courses=courses)
+    return render_template("home.html", course_grid=render_course_grid())
 
 @app.route("/signup", methods=["POST", "GET"])
 def signup():
@@ -99,6 +320,9 @@ def login():
     if request.method == "POST":
         username = request.form.get("username")
         password = request.form.get("password")
+        throttled = throttle('login', username, "login.html")
+        if throttled:
+            return throttled
 
         if username == ADMIN_USERNAME and password == ADMIN_PASSWORD:
             session['username'] = username
@@ -107,9 +331,10 @@ def login():
             return redirect(url_for('admin'))
 
         if user_manager.check_credentials(username, password):
+            rate_limiter.reset('login_username', username.strip().lower())
             session['username'] = username
             session['is_admin'] = False
-            session['cart'] = [] # Initialize empty cart on login
+            session['cart'] = {} # Initialize empty cart on login
             flash(f"Welcome back, {username}!", "success")
             return redirect(url_for('home'))
         else:
@@ -129,6 +354,9 @@ def forget_password():
     if request.method == 'POST':
         username = request.form.get('username')
         security_answer = request.form.get('security_answer')
+        throttled = throttle('reset', username, "forget_password.html")
+        if throttled:
+            return throttled
         # Here you would add logic to reset the password, maybe redirecting to a new page
         # For now, let's just check the answer
         user = user_manager.get_user(username)
@@ -142,6 +370,10 @@ def forget_password():
     return render_template("forget_password.html")
 
 @app.route("/course/<coursename>", methods=["GET", "POST"])
+@page_cache.cached(
+    key=lambda coursename: ('course', coursename, 'username' in session),
+    version=lambda: course_manager.catalog_version()
+)
 def course_info(coursename):
     course = course_manager.get_course(coursename)
     if not course:
@@ -153,10 +385,7 @@ def course_info(coursename):
             flash("Please log in to add items to your cart.", "warning")
             return redirect(url_for('login'))
         
-        cart = session.get('cart', [])
-        if course['title'] not in cart:
-            cart.append(course['title'])
-            session['cart'] = cart
+        if add_to_cart(course['title']):
             flash(f"'{course['title']}' added to your cart.", "success")
         else:
             flash(f"'{course['title']}' is already in your cart.", "info")
@@ -174,18 +403,14 @@ def user(username):
         flash("You can only view your own profile.", "danger")
         return redirect(url_for('home'))
 
-    cart = session.get('cart', [])
     if request.method == "POST": # Handle removing from cart
         course_to_remove = request.form.get('name')
-        if course_to_remove in cart:
-            cart.remove(course_to_remove)
-            session['cart'] = cart
+        if remove_from_cart(course_to_remove):
             flash(f"'{course_to_remove}' removed from cart.", "info")
 
     user_data = user_manager.get_user(username)
-    enrolled_titles = user_manager.get_user_courses(username)
-    user_courses = [course_manager.get_course(c['course_title']) for c in enrolled_titles if course_manager.get_course(c['course_title'])]
-    cart_courses = [course_manager.get_course(title) for title in cart if course_manager.get_course(title)]
+    user_courses = user_manager.get_enrolled_courses(username)
+    cart_courses = course_manager.get_courses(get_cart())
     
     return render_template("userPanel.html", user=user_data, user_courses=user_courses, cart=cart_courses)
 
@@ -217,16 +442,20 @@ def user_save(username):
     if username != session.get('username'):
         return redirect(url_for('home'))
         
-    cart = session.get('cart', [])
+    cart = get_cart()
     if not cart:
         flash("Your cart is empty.", "warning")
         return redirect(url_for('user', username=username))
         
-    for course_title in cart:
-        user_manager.add_course_to_user(username, course_title)
+    enrolled, duplicates, missing = user_manager.enroll_courses(username, cart)
         
-    session['cart'] = [] # Clear the cart
-    flash("You have successfully enrolled in the new courses!", "success")
+    session['cart'] = {} # Clear the cart
+    if enrolled:
+        flash("You have successfully enrolled in the new courses!", "success")
+    if duplicates:
+        flash(f"You were already enrolled in: {', '.join(duplicates)}.", "info")
+    if missing:
+        flash(f"No longer available: {', '.join(missing)}.", "warning")
     return redirect(url_for('user', username=username))
 
 
@@ -246,8 +475,8 @@ def admin_courses():
         flash(f"Course '{course_to_delete}' deleted.", "success")
         return redirect(url_for('admin_courses'))
         
-    courses = course_manager.get_all_courses()
-    return render_template("admin_courses.html", courses=courses)
+    page = get_course_page()
+    return render_template("admin_courses.html", courses=page['courses'], page=page)
 
 @app.route("/admin/courses/add", methods=["GET", "POST"])
 @admin_required
@@ -268,6 +497,18 @@ def admin_courses_add():
 @admin_required
 def admin_courses_edit(courseName):
     if request.method == "POST":
+        title = request.form.get("title", courseName).strip()
+        if not title:
+            flash("Course title cannot be empty.", "danger")
+            return redirect(url_for("admin_courses_edit", courseName=courseName))
+        # Only an edited title is renamed; existing mixed-case titles stay as they are.
+        if title != courseName:
+            new_title = title.lower()
+            success, message = course_manager.rename_course(courseName, new_title)
+            if not success:
+                flash(message, "danger")
+                return redirect(url_for("admin_courses_edit", courseName=courseName))
+            courseName = new_title
         course_manager.update_course(
             title=courseName,
             description=request.form.get("description"),
@@ -284,15 +525,90 @@ def admin_courses_edit(courseName):
 @app.route("/admin/students")
 @admin_required
 def admin_students():
-    students = user_manager.get_all_users()
-    return render_template("admin_students.html", students=students)
+    sort = request.args.get('sort', 'id')
+    descending = request.args.get('order') == 'desc'
+    page = user_manager.list_users(
+        sort=sort,
+        descending=descending,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        limit=app.config['STUDENTS_PER_PAGE']
+    )
+    return render_template("admin_students.html", students=page['users'], page=page, sort=sort, descending=descending)
+
+@app.route("/admin/analytics")
+@admin_required
+def admin_analytics():
+    return render_template(
+        "admin_analytics.html",
+        totals=analytics_manager.totals(),
+        popular=analytics_manager.most_popular_courses(),
+        signups=analytics_manager.signups_per_day(),
+        enrollments=analytics_manager.course_enrollments(after=request.args.get('after'))
+    )
+
+@app.cli.command('init-db')
+def init_db():
+    """Create the databases and tables and apply pending migrations."""
+    db_manager.init_databases()
+    print("Database schema is ready." if db_manager.schema_ready() else "Database initialization failed.")
+
+@app.cli.command('migrate')
+def migrate():
+    """Apply pending schema migrations."""
+    applied = db_manager.migrate()
+    print(f"Applied migrations: {', '.join(map(str, applied))}." if applied else "No pending migrations.")
+
+@app.cli.command('rollup-analytics')
+def rollup_analytics():
+    """Recompute the enrollment and signup summary tables from scratch."""
+    analytics_manager.rollup()
+    print("Analytics summary tables rebuilt.")
+
+@app.cli.command('run-maintenance')
+def run_maintenance():
+    """Run queued cross-database maintenance jobs now and report their progress."""
+    finished = maintenance_worker.run_once()
+    if finished is None:
+        print("Another process is running maintenance jobs.")
+        return
+    print(f"Finished {finished} maintenance job(s).")
+    for job in maintenance_worker.recent_jobs():
+        title = job['old_title'] or ''
+        if job['new_title']:
+            title += f" -> {job['new_title']}"
+        print(f"#{job['id']:<6} {job['kind']:<14} {job['status']:<8} {job['processed']:>8} rows  {title}"
+              + (f"  ({job['error']})" if job['error'] else ""))
     
 
+# --- SEARCH API ---
+
+@app.route("/api/courses/search")
+def api_search_courses():
+    query = request.args.get("q", "")
+    limit = min(request.args.get("limit", 10, type=int), 50)
+    results = course_manager.search_courses(query, limit=limit)
+    return jsonify([
+        {
+            "title": course['title'],
+            "description": course['description'],
+            "url": url_for('course_info', coursename=course['title'])
+        }
+        for course in results
+    ])
+
+@app.route("/api/courses/autocomplete")
+def api_autocomplete_courses():
+    prefix = request.args.get("q", "")
+    limit = min(request.args.get("limit", 8, type=int), 20)
+    return jsonify(course_manager.autocomplete_courses(prefix, limit=limit))
+
+
 # --- FILE SERVING & APP RUN ---
 
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return serve_upload(app.config['UPLOAD_FOLDER'], filename, cache=upload_cache)
 
 if __name__ == '__main__':
     if not os.path.exists(UPLOAD_FOLDER):
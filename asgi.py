@@ -0,0 +1,157 @@
+"""ASGI entry point: read-heavy pages as async views, everything else via the Flask app.
+
+Run with e.g. ``hypercorn asgi:application --workers 1``. GET/HEAD requests for
+home, course_info, user and admin_students are served by async Quart views on
+an aiomysql pool, so one process holds thousands of in-flight requests while
+they wait on MySQL; all other requests fall through to the existing WSGI app.
+"""
+import asyncio
+import os
+from functools import wraps
+
+from asgiref.wsgi import WsgiToAsgi
+from quart import Quart, flash, redirect, render_template, request, session, url_for
+from quart.sessions import SessionInterface
+from werkzeug.exceptions import HTTPException
+
+import app as wsgi
+from async_database import AsyncCourseManager, AsyncDatabaseManager, AsyncUserManager
+
+ASYNC_ENDPOINTS = {'home', 'course_info', 'user', 'admin_students'}
+
+# --- APP INITIALIZATION ---
+quart_app = Quart(__name__, static_folder=wsgi.app.static_folder, template_folder=wsgi.app.template_folder)
+quart_app.secret_key = wsgi.app.secret_key
+quart_app.config.update({key: value for key, value in wsgi.app.config.items() if key.isupper()})
+quart_app.add_template_filter(wsgi.basename_filter, 'basename')
+quart_app.add_template_filter(wsgi.thumbnail_filter, 'thumbnail')
+
+
+class AsyncSessionInterface(SessionInterface):
+    """Shares the Flask app's server-side session store; store I/O runs off the event loop."""
+
+    def __init__(self, sync_interface):
+        self.sync_interface = sync_interface
+
+    async def open_session(self, app, request):
+        return await asyncio.to_thread(self.sync_interface.open_session, app, request)
+
+    async def save_session(self, app, session, response):
+        await asyncio.to_thread(self.sync_interface.save_session, app, session, response)
+
+
+quart_app.session_interface = AsyncSessionInterface(wsgi.app.session_interface)
+
+# --- DATABASE & MANAGER INITIALIZATION ---
+# The catalog cache and search index are shared with the sync CourseManager, so
+# course writes handled by the Flask app invalidate what the async views serve.
+async_db_manager = AsyncDatabaseManager(wsgi.db_manager.connection_params,
+                                        maxsize=int(os.environ.get('ASYNC_DB_POOL_SIZE', 50)))
+async_user_manager = AsyncUserManager(async_db_manager)
+async_course_manager = AsyncCourseManager(async_db_manager, shared_with=wsgi.course_manager)
+
+
+@quart_app.after_serving
+async def close_pools():
+    await async_db_manager.close()
+
+
+# --- HELPER FUNCTIONS & DECORATORS ---
+
+def login_required(f):
+    @wraps(f)
+    async def decorated_function(*args, **kwargs):
+        if "username" not in session:
+            await flash("You need to be logged in to view this page.", "warning")
+            return redirect(url_for('login'))
+        return await f(*args, **kwargs)
+    return decorated_function
+
+def admin_required(f):
+    @wraps(f)
+    async def decorated_function(*args, **kwargs):
+        if not session.get('is_admin'):
+            await flash("You need admin privileges to view this page.", "danger")
+            return redirect(url_for('home'))
+        return await f(*args, **kwargs)
+    return decorated_function
+
+
+# --- ASYNC ROUTES ---
+
+@quart_app.route("/")
+async def home():
+    page = await async_course_manager.list_courses(
+        after=request.args.get('after', type=int),
+        before=request.args.get('before', type=int),
+        limit=quart_app.config['COURSES_PER_PAGE']
+    )
+    return await render_template("home.html", courses=page['courses'], page=page)
+
+@quart_app.route("/course/<coursename>")
+async def course_info(coursename):
+    course = await async_course_manager.get_course(coursename)
+    if not course:
+        await flash("Course not found.", "danger")
+        return redirect(url_for('home'))
+    return await render_template("course.html", course=course)
+
+@quart_app.route("/user/<username>")
+@login_required
+async def user(username):
+    if username != session.get('username'):
+        await flash("You can only view your own profile.", "danger")
+        return redirect(url_for('home'))
+
+    user_data, user_courses, cart_courses = await asyncio.gather(
+        async_user_manager.get_user(username),
+        async_user_manager.get_enrolled_courses(username),
+        async_course_manager.get_courses(list(session.get('cart') or ())),
+    )
+    return await render_template("userPanel.html", user=user_data, user_courses=user_courses, cart=cart_courses)
+
+@quart_app.route("/admin/students")
+@admin_required
+async def admin_students():
+    sort = request.args.get('sort', 'id')
+    descending = request.args.get('order') == 'desc'
+    page = await async_user_manager.list_users(
+        sort=sort,
+        descending=descending,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        limit=quart_app.config['STUDENTS_PER_PAGE']
+    )
+    return await render_template("admin_students.html", students=page['users'], page=page, sort=sort,
+                                 descending=descending)
+
+
+# Mirror the remaining Flask routes so url_for() in shared templates can build them;
+# the dispatcher below never sends those requests here.
+def _served_by_wsgi(**kwargs):
+    raise RuntimeError("This endpoint is served by the WSGI app.")
+
+for rule in wsgi.app.url_map.iter_rules():
+    if rule.endpoint not in ASYNC_ENDPOINTS and rule.endpoint != 'static':
+        quart_app.add_url_rule(rule.rule, rule.endpoint, _served_by_wsgi, methods=rule.methods)
+
+
+# --- ASGI DISPATCH ---
+
+wsgi_application = WsgiToAsgi(wsgi.app)
+_url_adapter = wsgi.app.url_map.bind('localhost')
+
+def _served_async(scope):
+    if scope['method'] not in ('GET', 'HEAD'):
+        return False
+    try:
+        endpoint, _ = _url_adapter.match(scope['path'], method='GET')
+    except HTTPException:
+        return False
+    return endpoint in ASYNC_ENDPOINTS
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan' or (scope['type'] == 'http' and _served_async(scope)):
+        await quart_app(scope, receive, send)
+    else:
+        await wsgi_application(scope, receive, send)
@@ -0,0 +1,214 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from database import (_MISSING, CatalogCache, _build_courses_page, _build_users_page, _courses_page_query,
+                      _users_page_query)
+from search import CourseSearchIndex
+
+try:
+    import aiomysql
+except ImportError:  # The async data layer is optional; the WSGI app does not need it.
+    aiomysql = None
+
+
+class AsyncDatabaseManager:
+    """asyncio counterpart of DatabaseManager backed by one aiomysql pool per database."""
+
+    def __init__(self, connection_params, minsize=1, maxsize=50, pool_recycle=3600):
+        if aiomysql is None:
+            raise RuntimeError("aiomysql is required for the async data layer (pip install aiomysql).")
+        params = dict(connection_params)
+        params.pop('cursorclass', None)
+        self.connection_params = params
+        self.pool_options = {'minsize': minsize, 'maxsize': maxsize, 'pool_recycle': pool_recycle}
+        self._pools = {}
+        self._pools_lock = asyncio.Lock()
+
+    async def _get_pool(self, database_name):
+        pool = self._pools.get(database_name)
+        if pool is None:
+            async with self._pools_lock:
+                pool = self._pools.get(database_name)
+                if pool is None:
+                    pool = await aiomysql.create_pool(
+                        db=database_name, cursorclass=aiomysql.DictCursor, autocommit=False,
+                        **self.connection_params, **self.pool_options
+                    )
+                    self._pools[database_name] = pool
+        return pool
+
+    @asynccontextmanager
+    async def get_connection(self, database_name):
+        pool = await self._get_pool(database_name)
+        async with pool.acquire() as connection:
+            try:
+                yield connection
+                await connection.commit()
+            except Exception:
+                await connection.rollback()
+                raise
+
+    async def fetchone(self, database_name, sql, params=()):
+        async with self.get_connection(database_name) as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(sql, params)
+                return await cursor.fetchone()
+
+    async def fetchall(self, database_name, sql, params=()):
+        async with self.get_connection(database_name) as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(sql, params)
+                return await cursor.fetchall()
+
+    def pool_metrics(self):
+        return {name: {'size': pool.size, 'idle': pool.freesize, 'max_size': pool.maxsize}
+                for name, pool in self._pools.items()}
+
+    async def close(self):
+        for pool in self._pools.values():
+            pool.close()
+            await pool.wait_closed()
+        self._pools.clear()
+
+
+class AsyncUserManager:
+    """Awaitable versions of the UserManager read path used by the async views.
+
+    Logins and every write are served by the Flask app through UserManager.
+    """
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    async def get_user(self, username):
+        return await self.db_manager.fetchone('users', "SELECT * FROM customers WHERE username = %s", (username,))
+
+    async def get_all_users(self):
+        return await self.db_manager.fetchall('users', "SELECT id, username, email, image_path, created_at FROM customers")
+
+    async def list_users(self, sort='id', descending=False, after=None, before=None, limit=25):
+        sql, params = _users_page_query(sort, descending, after, before, limit)
+        rows = await self.db_manager.fetchall('users', sql, params)
+        return _build_users_page(rows, sort, after, before, limit)
+
+    async def get_user_courses(self, username):
+        return await self.db_manager.fetchall('users', "SELECT course_title FROM user_courses WHERE username = %s",
+                                              (username,))
+
+    async def get_enrolled_courses(self, username):
+        return await self.db_manager.fetchall('users', """
+            SELECT c.* FROM user_courses uc
+            JOIN courses.courseinfo c ON c.id = uc.course_id
+            WHERE uc.username = %s
+            ORDER BY uc.enrolled_at, uc.id
+        """, (username,))
+
+
+class AsyncCourseManager:
+    """Awaitable versions of the CourseManager read path.
+
+    Pass the process's CourseManager as shared_with to reuse its catalog cache and
+    search index, so course writes made through the sync manager invalidate both.
+    """
+
+    def __init__(self, db_manager, shared_with=None, cache_size=256, cache_ttl=60, version_check_interval=None):
+        self.db_manager = db_manager
+        if shared_with is not None:
+            self.cache = shared_with.cache
+            self.search_index = shared_with.search_index
+            self.version_check_interval = shared_with.version_check_interval
+        else:
+            self.cache = CatalogCache(max_entries=cache_size, ttl=cache_ttl)
+            self.search_index = CourseSearchIndex()
+            self.version_check_interval = version_check_interval
+        self._last_version_check = 0.0
+        self._search_index_version = None
+
+    async def _check_version(self):
+        if self.version_check_interval is None:
+            return
+        now = time.monotonic()
+        if now - self._last_version_check < self.version_check_interval:
+            return
+        self._last_version_check = now
+        row = await self.db_manager.fetchone('courses', "SELECT version FROM catalog_version WHERE id = 1")
+        version = row['version'] if row else None
+        if version != self.cache.version:
+            self.cache.clear()
+            self.cache.version = version
+
+    async def _ensure_search_index(self):
+        await self._check_version()
+        if not self.search_index.built or self._search_index_version != self.cache.version:
+            version = self.cache.version
+            rows = await self.db_manager.fetchall('courses', "SELECT title, description FROM courseinfo")
+            self.search_index.rebuild(rows)
+            self._search_index_version = version
+
+    async def search_courses(self, query, limit=10):
+        await self._ensure_search_index()
+        return await self.get_courses(self.search_index.search(query, limit=limit))
+
+    async def autocomplete_courses(self, prefix, limit=8):
+        await self._ensure_search_index()
+        return self.search_index.autocomplete(prefix, limit=limit)
+
+    async def get_course(self, title):
+        await self._check_version()
+        key = ('course', title)
+        course = self.cache.get(key)
+        if course is not _MISSING:
+            return course
+        generation = self.cache.generation
+        course = await self.db_manager.fetchone('courses', "SELECT * FROM courseinfo WHERE title = %s", (title,))
+        self.cache.set(key, course, generation)
+        return course
+
+    async def get_courses(self, titles):
+        titles = list(dict.fromkeys(t for t in titles if t))
+        if not titles:
+            return []
+        await self._check_version()
+        found = {}
+        missing = []
+        for title in titles:
+            course = self.cache.get(('course', title))
+            if course is _MISSING:
+                missing.append(title)
+            else:
+                found[title] = course
+        if missing:
+            generation = self.cache.generation
+            placeholders = ", ".join(["%s"] * len(missing))
+            rows = await self.db_manager.fetchall(
+                'courses', f"SELECT * FROM courseinfo WHERE title IN ({placeholders})", tuple(missing)
+            )
+            rows = {row['title']: row for row in rows}
+            for title in missing:
+                found[title] = rows.get(title)
+                self.cache.set(('course', title), found[title], generation)
+        return [found[title] for title in titles if found[title]]
+
+    async def get_all_courses(self):
+        await self._check_version()
+        courses = self.cache.get(('all',))
+        if courses is not _MISSING:
+            return courses
+        generation = self.cache.generation
+        courses = await self.db_manager.fetchall('courses', "SELECT * FROM courseinfo")
+        self.cache.set(('all',), courses, generation)
+        return courses
+
+    async def list_courses(self, after=None, before=None, limit=12, snippet_length=200):
+        await self._check_version()
+        key = ('page', after, before, limit, snippet_length)
+        page = self.cache.get(key)
+        if page is not _MISSING:
+            return page
+        generation = self.cache.generation
+        sql, params = _courses_page_query(after, before, limit, snippet_length)
+        rows = await self.db_manager.fetchall('courses', sql, params)
+        page = _build_courses_page(rows, after, before, limit, snippet_length)
+        self.cache.set(key, page, generation)
+        return page
@@ -0,0 +1,564 @@
+"""Benchmarks for the Flask routes and the manager classes.
+
+By default everything runs against SQLiteDatabaseManager, a stand-in that
+executes the managers' SQL on temporary SQLite files, so no MySQL server is
+needed. Pass --mysql to benchmark against the server configured in
+DatabaseManager instead (the dataset is written into it).
+
+    py bench.py --users 500 --courses 200 --enrollments 5000 --output before.json
+    py bench.py --compare before.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import re
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from urllib.parse import quote
+
+import pymysql
+
+from database import AnalyticsManager, DatabaseManager, _TimedCursorMixin
+from passwords import PBKDF2, PasswordHasher
+
+SEED_PASSWORD = "Bench1234"
+
+# MySQL returns TIMESTAMP columns as datetimes, and the templates format them as such.
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("DATE", lambda value: datetime.date.fromisoformat(value.decode()))
+
+
+# --- SQLITE STAND-IN FOR MYSQL ---
+
+@lru_cache(maxsize=512)
+def _translate(sql):
+    """Rewrites the MySQL dialect used by the managers into SQLite."""
+    sql = sql.replace("%s", "?")
+    sql = re.sub(r"\bINSERT IGNORE\b", "INSERT OR IGNORE", sql)
+    sql = re.sub(r"\bLEFT\((\w+),", r"SUBSTR(\1, 1,", sql)
+    sql = re.sub(r"\bFOR (UPDATE|SHARE)\b", "", sql)
+    # UPDATE t a JOIN u b ON ... SET a.x = ... WHERE ... becomes UPDATE ... FROM (SQLite 3.33+).
+    join = re.match(r"\s*UPDATE (\w+) (\w+)\s+JOIN (\S+) (\w+) ON (.+?)\s+SET (.+?)\s+WHERE\b", sql, re.S)
+    if join:
+        table, alias, other, other_alias, condition, assignments = join.groups()
+        assignments = re.sub(rf"(^|,\s*){alias}\.", r"\1", assignments)
+        sql = (f"UPDATE {table} AS {alias} SET {assignments} FROM {other} AS {other_alias} "
+               f"WHERE ({condition}) AND" + sql[join.end():])
+    head, upsert, assignments = sql.partition("ON DUPLICATE KEY UPDATE")
+    if upsert:
+        sql = head + "ON CONFLICT DO UPDATE SET" + re.sub(r"\bVALUES\((\w+)\)", r"excluded.\1", assignments)
+    return sql
+
+
+class _SQLiteCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self._cursor = connection.raw.cursor()
+        self._rows = deque()
+        self.rowcount = -1
+        self.lastrowid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._cursor.close()
+
+    def _run(self, method, query, args):
+        try:
+            method(_translate(query), args)
+        except sqlite3.IntegrityError as e:
+            message = str(e)
+            if message.startswith("UNIQUE"):
+                message = f"Duplicate entry: {message}"
+            raise pymysql.err.IntegrityError(1062, message) from e
+        except sqlite3.OperationalError as e:
+            raise pymysql.err.ProgrammingError(1064, f"{e} in: {query}") from e
+        if self._cursor.description is not None:
+            columns = [column[0] for column in self._cursor.description]
+            self._rows = deque(dict(zip(columns, row)) for row in self._cursor.fetchall())
+            self.rowcount = len(self._rows)
+        else:
+            self._rows = deque()
+            self.rowcount = self._cursor.rowcount
+        self.lastrowid = self._cursor.lastrowid
+        return self.rowcount
+
+    def execute(self, query, args=None):
+        return self._run(self._cursor.execute, query, tuple(args or ()))
+
+    def executemany(self, query, args):
+        return self._run(self._cursor.executemany, query, [tuple(row) for row in args])
+
+    def fetchone(self):
+        return self._rows.popleft() if self._rows else None
+
+    def fetchall(self):
+        rows = list(self._rows)
+        self._rows.clear()
+        return rows
+
+    def __iter__(self):
+        while self._rows:
+            yield self._rows.popleft()
+
+
+class _InstrumentedSQLiteCursor(_TimedCursorMixin, _SQLiteCursor):
+    pass
+
+
+class _SQLiteConnection:
+    def __init__(self, directory, database_name, databases, query_hooks):
+        self.db = database_name
+        self.query_hooks = query_hooks
+        self.open = True
+        self.raw = sqlite3.connect(os.path.join(directory, f"{database_name}.sqlite3"), timeout=30,
+                                   detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        self.raw.execute("PRAGMA journal_mode=WAL")
+        self.raw.execute("PRAGMA foreign_keys=ON")
+        # Other databases are attached under their own name, so cross-database
+        # references such as courses.courseinfo resolve as they do on MySQL.
+        for other in databases:
+            if other != database_name:
+                self.raw.execute("ATTACH DATABASE ? AS " + other, (os.path.join(directory, f"{other}.sqlite3"),))
+
+    def cursor(self, cursor_class=None):
+        return _InstrumentedSQLiteCursor(self)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        self.open = False
+        self.raw.close()
+
+
+class _SQLitePool:
+    def __init__(self, directory, database_name, databases, query_hooks):
+        self.factory = lambda: _SQLiteConnection(directory, database_name, databases, query_hooks)
+        self._idle = []
+        self._lock = threading.Lock()
+        self.max_size = 10
+        self.stats = {'checkouts': 0, 'created': 0}
+
+    def acquire(self):
+        with self._lock:
+            self.stats['checkouts'] += 1
+            if self._idle:
+                return self._idle.pop()
+            self.stats['created'] += 1
+        return self.factory()
+
+    def release(self, connection, discard=False):
+        if discard:
+            connection.close()
+            return
+        with self._lock:
+            self._idle.append(connection)
+
+    def close(self):
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
+
+    def metrics(self):
+        with self._lock:
+            return dict(self.stats, idle=len(self._idle))
+
+
+class SQLiteDatabaseManager(DatabaseManager):
+    """DatabaseManager that keeps the users and courses databases in SQLite files under directory."""
+
+    DATABASES = ('users', 'courses')
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._named_locks = {}
+        super().__init__()
+        self.init_databases()
+
+    def _get_pool(self, database_name, replica=None):
+        pool = self._pools.get(database_name)
+        if pool is None:
+            with self._pools_lock:
+                pool = self._pools.get(database_name)
+                if pool is None:
+                    pool = _SQLitePool(self.directory, database_name, self.DATABASES, self.query_hooks)
+                    self._pools[database_name] = pool
+        return pool
+
+    @contextmanager
+    def named_lock(self, name, timeout=0):
+        # Stand-in for GET_LOCK: the benchmark runs in a single process.
+        lock = self._named_locks.setdefault(name, threading.Lock())
+        acquired = lock.acquire(timeout=timeout) if timeout else lock.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+
+    def init_databases(self):
+        # The SQLite schema is created at the latest migration; migrate() is MySQL-only.
+        with self.get_connection('users') as conn:
+            conn.raw.executescript("""
+                CREATE TABLE IF NOT EXISTS customers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username VARCHAR(255) UNIQUE NOT NULL,
+                    email VARCHAR(255) UNIQUE NOT NULL,
+                    password VARCHAR(255) NOT NULL,
+                    image_path VARCHAR(255),
+                    security_question TEXT,
+                    security_answer VARCHAR(255) NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE TABLE IF NOT EXISTS user_courses (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username VARCHAR(255) REFERENCES customers(username) ON DELETE CASCADE,
+                    course_title VARCHAR(255),
+                    course_id INT NULL,
+                    enrolled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    CONSTRAINT unique_enrollment_course UNIQUE (username, course_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_user_courses_course_id ON user_courses (course_id, username);
+                CREATE INDEX IF NOT EXISTS idx_user_courses_course_title ON user_courses (course_title);
+                CREATE INDEX IF NOT EXISTS idx_customers_created_at ON customers (created_at);
+                CREATE TABLE IF NOT EXISTS enrollment_counts (
+                    course_id INT PRIMARY KEY,
+                    enrollments INT NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_enrollment_counts_popularity ON enrollment_counts (enrollments, course_id);
+                CREATE TABLE IF NOT EXISTS daily_signups (
+                    day DATE PRIMARY KEY,
+                    signups INT NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS maintenance_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind VARCHAR(32) NOT NULL,
+                    course_id INT NULL,
+                    old_title VARCHAR(255) NULL,
+                    new_title VARCHAR(255) NULL,
+                    status VARCHAR(16) NOT NULL DEFAULT 'pending',
+                    last_id INT NOT NULL DEFAULT 0,
+                    processed INT NOT NULL DEFAULT 0,
+                    error TEXT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    finished_at DOUBLE NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_maintenance_jobs_status ON maintenance_jobs (status, id);
+                CREATE INDEX IF NOT EXISTS idx_maintenance_jobs_kind ON maintenance_jobs (kind, status);
+                CREATE TABLE IF NOT EXISTS sessions (
+                    sid VARCHAR(64) PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    expires_at DOUBLE NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at);
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INT PRIMARY KEY,
+                    description VARCHAR(255) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            conn.raw.executemany("INSERT OR IGNORE INTO schema_migrations (version, description) VALUES (?, ?)",
+                                 [(version, description) for version, description, _ in self.MIGRATIONS])
+        with self.get_connection('courses') as conn:
+            conn.raw.executescript("""
+                CREATE TABLE IF NOT EXISTS courseinfo (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title VARCHAR(255) UNIQUE NOT NULL,
+                    description TEXT,
+                    photo_path VARCHAR(255),
+                    watch_hours INT,
+                    class_day VARCHAR(20),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE TABLE IF NOT EXISTS catalog_version (
+                    id TINYINT PRIMARY KEY,
+                    version BIGINT NOT NULL DEFAULT 0
+                );
+                INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0);
+            """)
+
+
+# --- DATASET ---
+
+WORDS = ("python flask sql data web design intro advanced practical machine learning cloud security "
+         "network algorithms statistics testing devops mobile ui ux writing finance marketing").split()
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday")
+
+
+def seed(db_manager, password_hash, users, courses, enrollments, rng):
+    """Inserts users, courses and random enrollments; returns (usernames, titles)."""
+    usernames = [f"student{i:05d}" for i in range(users)]
+    titles = [f"course-{i:05d}" for i in range(courses)]
+    with db_manager.get_connection('users') as conn:
+        with conn.cursor() as cursor:
+            cursor.executemany("""
+                INSERT IGNORE INTO customers (username, email, password, security_question, security_answer)
+                VALUES (%s, %s, %s, %s, %s)
+            """, [(name, f"{name}@example.com", password_hash, "Favourite colour?", "blue") for name in usernames])
+    with db_manager.get_connection('courses') as conn:
+        with conn.cursor() as cursor:
+            cursor.executemany("""
+                INSERT IGNORE INTO courseinfo (title, description, watch_hours, class_day)
+                VALUES (%s, %s, %s, %s)
+            """, [(title, " ".join(rng.choices(WORDS, k=60)), rng.randint(1, 40), rng.choice(DAYS))
+                  for title in titles])
+    pairs = {(rng.choice(usernames), rng.choice(titles)) for _ in range(enrollments)} if users and courses else set()
+    with db_manager.get_connection('users') as conn:
+        with conn.cursor() as cursor:
+            cursor.executemany("""
+                INSERT IGNORE INTO user_courses (username, course_title, course_id)
+                VALUES (%s, %s, (SELECT id FROM courses.courseinfo WHERE title = %s))
+            """, [(username, title, title) for username, title in sorted(pairs)])
+    AnalyticsManager(db_manager).rollup()
+    return usernames, titles
+
+
+# --- MEASUREMENT ---
+
+class QueryCounter:
+    def __init__(self):
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, database, sql, rowcount, seconds):
+        with self._lock:
+            self.total += 1
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def measure(operation, iterations, counter, warmup=5, prepare=None):
+    """Times operation(i) iterations times; prepare(i), if given, runs untimed before each call."""
+    for i in range(warmup):
+        if prepare:
+            prepare(-i - 1)
+        operation(-i - 1)
+    latencies = []
+    errors = 0
+    queries = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        if prepare:
+            prepare(i)
+        before = counter.total
+        op_started = time.perf_counter()
+        if not operation(i):
+            errors += 1
+        latencies.append(time.perf_counter() - op_started)
+        queries += counter.total - before
+    elapsed = time.perf_counter() - started
+    busy = sum(latencies)
+    latencies.sort()
+    return {
+        'requests': iterations,
+        'errors': errors,
+        'rps': iterations / busy if busy else 0.0,
+        'wall_seconds': round(elapsed, 3),
+        'p50_ms': _percentile(latencies, 0.50) * 1000,
+        'p95_ms': _percentile(latencies, 0.95) * 1000,
+        'p99_ms': _percentile(latencies, 0.99) * 1000,
+        'queries_per_request': queries / iterations if iterations else 0.0,
+    }
+
+
+# --- SCENARIOS ---
+
+def route_scenarios(app_module, usernames, titles, rng):
+    flask_app = app_module.app
+    anonymous = flask_app.test_client()
+    member = flask_app.test_client()
+    member_name = usernames[0]
+    member.post('/login', data={'username': member_name, 'password': SEED_PASSWORD})
+    admin = flask_app.test_client()
+    admin.post('/login', data={'username': app_module.ADMIN_USERNAME, 'password': app_module.ADMIN_PASSWORD})
+    signup_prefix = f"s{rng.randrange(16 ** 6):06x}"
+
+    def course_url(title):
+        return f"/course/{quote(title)}"
+
+    def add_to_cart(i):
+        for title in rng.sample(titles, min(3, len(titles))):
+            member.post(course_url(title))
+
+    return [
+        ('route.home', lambda i: anonymous.get('/').status_code == 200, None),
+        ('route.home_page2', lambda i: anonymous.get(f"/?after={len(titles) // 2}").status_code == 200, None),
+        ('route.course_info', lambda i: anonymous.get(course_url(rng.choice(titles))).status_code == 200, None),
+        ('route.user', lambda i: member.get(f"/user/{member_name}").status_code == 200, None),
+        ('route.user_save', lambda i: member.get(f"/user/{member_name}/save").status_code == 302, add_to_cart),
+        ('route.admin_students', lambda i: admin.get('/admin/students').status_code == 200, None),
+        ('route.admin_students_sorted',
+         lambda i: admin.get('/admin/students?sort=joined&order=desc').status_code == 200, None),
+        ('route.admin_analytics', lambda i: admin.get('/admin/analytics').status_code == 200, None),
+        ('route.signup', lambda i: anonymous.post('/signup', data={
+            'username': f"{signup_prefix}_{i + 10:06d}",
+            'email': f"{signup_prefix}_{i + 10}@example.com",
+            'password': SEED_PASSWORD,
+            'confirm_password': SEED_PASSWORD,
+            'security_question': "Favourite colour?",
+            'security_answer': "blue",
+        }).status_code == 302, None),
+        ('route.login', lambda i: anonymous.post('/login', data={
+            'username': rng.choice(usernames), 'password': SEED_PASSWORD,
+        }).status_code == 302, None),
+    ]
+
+
+def manager_scenarios(user_manager, course_manager, usernames, titles, rng):
+    return [
+        ('manager.get_course', lambda i: course_manager.get_course(rng.choice(titles)) is not None, None),
+        ('manager.get_courses', lambda i: bool(course_manager.get_courses(rng.sample(titles, min(10, len(titles))))),
+         None),
+        ('manager.list_courses', lambda i: bool(course_manager.list_courses()['courses']), None),
+        ('manager.search_courses', lambda i: course_manager.search_courses(rng.choice(WORDS)) is not None, None),
+        ('manager.get_user', lambda i: user_manager.get_user(rng.choice(usernames)) is not None, None),
+        ('manager.get_enrolled_courses',
+         lambda i: user_manager.get_enrolled_courses(rng.choice(usernames)) is not None, None),
+        ('manager.get_all_users', lambda i: bool(user_manager.get_all_users()), None),
+    ]
+
+
+def http_scenarios(flask_app, titles, counter, concurrency, requests):
+    """Serves the app from a threaded WSGI server and drives it with loadtest's keep-alive clients."""
+    import asyncio
+    import logging
+    from werkzeug.serving import make_server
+    import loadtest
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, flask_app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    results = {}
+    try:
+        base = f"http://127.0.0.1:{server.server_port}"
+        for name, path in (('http.home', '/'), ('http.course_info', f"/course/{quote(titles[0])}")):
+            before = counter.total
+            result = asyncio.run(loadtest.run(base + path, concurrency=concurrency, requests=requests))
+            result.pop('url')
+            result['concurrency'] = concurrency
+            result['queries_per_request'] = (counter.total - before) / max(result['requests'], 1)
+            results[name] = result
+    finally:
+        server.shutdown()
+    return results
+
+
+# --- REPORTING ---
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_results(results, baseline=None):
+    header = f"{'scenario':<32}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'q/req':>7}{'errors':>8}"
+    if baseline:
+        header += f"{'Δ p50':>9}{'Δ req/s':>9}"
+    print(header)
+    for name, r in results.items():
+        line = (f"{name:<32}{r['rps']:>10.1f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+                f"{r['queries_per_request']:>7.1f}{r['errors']:>8}")
+        old = (baseline or {}).get(name)
+        if old:
+            line += f"{_change(old['p50_ms'], r['p50_ms']):>9}{_change(old['rps'], r['rps']):>9}"
+        print(line)
+
+
+def _change(old, new):
+    if not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.0f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Flask routes and the manager classes.")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--courses', type=int, default=100)
+    parser.add_argument('--enrollments', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=200, help="timed calls per scenario")
+    parser.add_argument('--only', default=None, help="regular expression selecting scenario names")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--mysql', action='store_true', help="use the MySQL server configured in DatabaseManager")
+    parser.add_argument('--light-hashing', action='store_true',
+                        help="hash passwords with 1000 PBKDF2 rounds so signup/login measure the app, not the KDF")
+    parser.add_argument('--http', action='store_true', help="also drive anonymous pages over HTTP concurrently")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--http-requests', type=int, default=2000)
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    db_manager = DatabaseManager() if args.mysql else SQLiteDatabaseManager(workdir)
+    counter = QueryCounter()
+    db_manager.add_query_hook(counter)
+    hasher = PasswordHasher(PBKDF2, pbkdf2_iterations=1000) if args.light_hashing else PasswordHasher()
+    usernames, titles = seed(db_manager, hasher.hash(SEED_PASSWORD), args.users, args.courses, args.enrollments, rng)
+
+    import app as app_module
+    from sessions import CachedSessionStore, ServerSideSessionInterface, SQLiteSessionStore
+    managers = app_module.init_managers(db_manager, hasher)
+    user_manager, course_manager = managers['users'], managers['courses']
+    app_module.app.session_interface = ServerSideSessionInterface(
+        CachedSessionStore(SQLiteSessionStore(os.path.join(workdir, 'sessions.sqlite3'))))
+    app_module.app.logger.disabled = True
+    # Every scenario logs in from one address; lift the login throttle so it measures the app.
+    app_module.rate_limiter.limits = {name: (10 ** 9, 1) for name in app_module.rate_limiter.limits}
+
+    scenarios = (route_scenarios(app_module, usernames, titles, rng)
+                 + manager_scenarios(user_manager, course_manager, usernames, titles, rng))
+    results = {}
+    for name, operation, prepare in scenarios:
+        if args.only and not re.search(args.only, name):
+            continue
+        results[name] = measure(operation, args.iterations, counter, prepare=prepare)
+    if args.http and (not args.only or re.search(args.only, 'http.')):
+        results.update(http_scenarios(app_module.app, titles, counter, args.concurrency, args.http_requests))
+
+    report = {
+        'commit': _git_commit(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'backend': 'mysql' if args.mysql else 'sqlite',
+        'dataset': {'users': args.users, 'courses': args.courses, 'enrollments': args.enrollments,
+                    'seed': args.seed, 'light_hashing': args.light_hashing},
+        'results': results,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import csv
+import json
+import os
+import sys
+
+from database import AnalyticsManager, DatabaseManager, UserManager, CourseManager
+
+EXPORT_QUERIES = {
+    # Password hashes and security answers are never exported.
+    'customers': ('users', "SELECT id, username, email, image_path, security_question, created_at FROM customers ORDER BY id"),
+    'user_courses': ('users', "SELECT id, username, course_title, enrolled_at FROM user_courses ORDER BY id"),
+    'courseinfo': ('courses', "SELECT id, title, description, photo_path, watch_hours, class_day, created_at FROM courseinfo ORDER BY id"),
+}
+
+
+def _is_jsonl(path):
+    return os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson')
+
+
+def read_rows(path):
+    """Yields (row_number, row) pairs from a CSV or JSONL file without loading it whole."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if _is_jsonl(path):
+            for row_number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield row_number, json.loads(line)
+        else:
+            # Row 1 is the header, so data rows are numbered from 2 like in a spreadsheet.
+            for row_number, row in enumerate(csv.DictReader(f), start=2):
+                yield row_number, row
+
+
+def write_rows(rows, path, fieldnames=None):
+    """Streams dict rows to a CSV or JSONL file; returns the number of rows written."""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if _is_jsonl(path):
+            for row in rows:
+                f.write(json.dumps(row, default=str) + "\n")
+                count += 1
+            return count
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=fieldnames or list(row))
+                writer.writeheader()
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def import_file(table, path, user_manager, course_manager, chunk_size=500):
+    rows = read_rows(path)
+    if table == 'customers':
+        return user_manager.bulk_create_users(rows, chunk_size=chunk_size)
+    if table == 'user_courses':
+        return user_manager.bulk_add_courses_to_users(rows, course_manager, chunk_size=chunk_size)
+    if table == 'courseinfo':
+        return course_manager.bulk_create_courses(rows, chunk_size=chunk_size)
+    raise ValueError(f"Unknown table '{table}'.")
+
+
+def export_file(table, path, db_manager):
+    database_name, sql = EXPORT_QUERIES[table]
+    return write_rows(db_manager.stream_rows(database_name, sql), path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import/export of students, enrollments and courses.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    import_parser = subparsers.add_parser('import', help="import rows from a CSV or JSONL file")
+    import_parser.add_argument('table', choices=sorted(EXPORT_QUERIES))
+    import_parser.add_argument('path')
+    import_parser.add_argument('--chunk-size', type=int, default=500)
+    import_parser.add_argument('--errors', help="write the per-row error report to this CSV/JSONL file")
+    export_parser = subparsers.add_parser('export', help="export a table to a CSV or JSONL file")
+    export_parser.add_argument('table', choices=sorted(EXPORT_QUERIES))
+    export_parser.add_argument('path')
+    args = parser.parse_args(argv)
+
+    db_manager = DatabaseManager()
+    if args.command == 'export':
+        count = export_file(args.table, args.path, db_manager)
+        print(f"Exported {count} rows from {args.table} to {args.path}.")
+        return 0
+
+    inserted, errors = import_file(args.table, args.path, UserManager(db_manager), CourseManager(db_manager),
+                                   chunk_size=args.chunk_size)
+    if inserted:
+        # Bulk inserts bypass the incremental counters, so rebuild the dashboards' summaries.
+        AnalyticsManager(db_manager).rollup()
+    errors.sort()
+    print(f"Imported {inserted} rows into {args.table}; {len(errors)} rows rejected.")
+    if args.errors:
+        write_rows(({'row': row_number, 'error': message} for row_number, message in errors), args.errors,
+                   fieldnames=['row', 'error'])
+    else:
+        for row_number, message in errors:
+            print(f"  row {row_number}: {message}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,35 +1,476 @@
+import contextvars
+import datetime
+import itertools
+import logging
 import pymysql
 import re
+import threading
+import time
+from collections import OrderedDict, deque
 from contextlib import contextmanager
-import hashlib
+from passwords import PasswordHasher
+from search import CourseSearchIndex
+
+
+_MISSING = object()
+logger = logging.getLogger(__name__)
+
+# Per-request routing state (see DatabaseManager.start_request): whether reads must
+# go to the primary, and whether this request has written through the primary.
+_read_primary = contextvars.ContextVar('read_primary', default=False)
+_wrote = contextvars.ContextVar('wrote', default=False)
+
+
+class _TimedCursorMixin:
+    """Reports every statement to the connection's query hooks."""
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            hooks = getattr(self.connection, 'query_hooks', None)
+            if hooks:
+                elapsed = time.perf_counter() - started
+                for hook in hooks:
+                    hook(self.connection.db, query, self.rowcount, elapsed)
+
+
+class InstrumentedDictCursor(_TimedCursorMixin, pymysql.cursors.DictCursor):
+    pass
+
+
+class InstrumentedSSDictCursor(_TimedCursorMixin, pymysql.cursors.SSDictCursor):
+    pass
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of connections to a single database."""
+
+    def __init__(self, connection_params, max_size=10, timeout=30, max_idle=300, max_lifetime=3600, query_hooks=None):
+        self.connection_params = connection_params
+        self.query_hooks = query_hooks if query_hooks is not None else []
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self._idle = deque()  # (connection, created_at, released_at)
+        self._created_at = {}
+        self._size = 0
+        self._lock = threading.Condition()
+        self.stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'closed': 0,
+            'failed_pings': 0,
+        }
+
+    def _connect(self):
+        connection = pymysql.connect(**self.connection_params)
+        connection.query_hooks = self.query_hooks
+        self._created_at[id(connection)] = time.monotonic()
+        self.stats['created'] += 1
+        return connection
+
+    def _close(self, connection):
+        self._created_at.pop(id(connection), None)
+        self.stats['closed'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _is_expired(self, created_at, released_at, now):
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            return True
+        if self.max_idle and now - released_at > self.max_idle:
+            return True
+        return False
+
+    def _is_healthy(self, connection):
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception:
+            self.stats['failed_pings'] += 1
+            return False
+
+    def _evict_expired(self, now):
+        # The idle deque is ordered by release time and acquire() takes from the
+        # right, so connections left over from a spike age out at the left end.
+        while self._idle and self._is_expired(self._idle[0][1], self._idle[0][2], now):
+            connection, _, _ = self._idle.popleft()
+            self._size -= 1
+            self._close(connection)
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        wait_started = None
+        while True:
+            with self._lock:
+                self._evict_expired(time.monotonic())
+                connection = None
+                while self._idle:
+                    candidate, created_at, released_at = self._idle.pop()
+                    if self._is_expired(created_at, released_at, time.monotonic()):
+                        self._size -= 1
+                        self._close(candidate)
+                        continue
+                    connection = candidate
+                    break
+                if connection is None:
+                    if self._size < self.max_size:
+                        self._size += 1
+                        reserved = True
+                    else:
+                        if not waited:
+                            waited = True
+                            wait_started = time.monotonic()
+                            self.stats['waits'] += 1
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.stats['timeouts'] += 1
+                            raise PoolTimeoutError(
+                                f"Timed out after {self.timeout}s waiting for a connection "
+                                f"to '{self.connection_params.get('database')}'."
+                            )
+                        self._lock.wait(remaining)
+                        continue
+                else:
+                    reserved = False
+                self.stats['checkouts'] += 1
+                if waited:
+                    self.stats['wait_time'] += time.monotonic() - wait_started
+
+            # Network I/O (connect/ping) happens outside the lock.
+            if reserved:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+            if self._is_healthy(connection):
+                return connection
+            with self._lock:
+                self._size -= 1
+                self._close(connection)
+                self._lock.notify()
+
+    def release(self, connection, discard=False):
+        with self._lock:
+            created_at = self._created_at.get(id(connection), 0)
+            if discard or not connection.open:
+                self._size -= 1
+                self._close(connection)
+            else:
+                self._idle.append((connection, created_at, time.monotonic()))
+            self._evict_expired(time.monotonic())
+            self._lock.notify()
+
+    def close(self):
+        with self._lock:
+            while self._idle:
+                connection, _, _ = self._idle.popleft()
+                self._size -= 1
+                self._close(connection)
+            self._lock.notify_all()
+
+    def metrics(self):
+        with self._lock:
+            return dict(self.stats, size=self._size, idle=len(self._idle), in_use=self._size - len(self._idle),
+                        max_size=self.max_size)
+
 
 class DatabaseManager:
-    def __init__(self):
+    """Pooled connections to the users and courses databases on a primary and optional read replicas.
+
+    replicas is a list of "host:port" strings or dicts of connection parameters
+    that override the primary's. get_connection(readonly=True) reads from a
+    healthy replica (round robin, or lowest ping with replica_strategy=
+    'least_latency') and falls back to the primary when none is available.
+    """
+
+    def __init__(self, pool_size=10, pool_timeout=30, max_idle=300, max_lifetime=3600, host="127.0.0.1", port=3306,
+                 replicas=(), replica_strategy='round_robin', replica_stickiness=5, health_check_interval=10,
+                 replica_retry_interval=30, max_replica_lag=None):
         self.connection_params = {
-            'host': "127.0.0.1",
+            'host': host,
+            'port': port,
             'user': "",
             'password': "",
             'charset': 'utf8mb4',
-            'cursorclass': pymysql.cursors.DictCursor
+            'cursorclass': InstrumentedDictCursor
+        }
+        self.replicas = [self._replica_params(replica) for replica in replicas]
+        self.replica_strategy = replica_strategy
+        # Seconds a session (or, for the catalog, the process) keeps reading from the
+        # primary after it writes, so it never reads its own write from a lagging replica.
+        self.replica_stickiness = replica_stickiness
+        self.health_check_interval = health_check_interval
+        self.replica_retry_interval = replica_retry_interval
+        self.max_replica_lag = max_replica_lag
+        self._replica_state = [{'down_until': 0.0, 'latency': None, 'failures': 0} for _ in self.replicas]
+        self._round_robin = itertools.count()
+        self._health_checker = None
+        # Callables invoked as hook(database, sql, rowcount, seconds) after every statement.
+        self.query_hooks = []
+        self.pool_options = {
+            'max_size': pool_size,
+            'timeout': pool_timeout,
+            'max_idle': max_idle,
+            'max_lifetime': max_lifetime,
         }
-        self.init_databases()
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _replica_params(self, replica):
+        if isinstance(replica, str):
+            host, _, port = replica.partition(':')
+            replica = {'host': host, 'port': int(port) if port else self.connection_params['port']}
+        return dict(self.connection_params, **replica)
+
+    def _get_pool(self, database_name, replica=None):
+        # Pools are named after what they serve; the name is also the metrics label.
+        name = database_name if replica is None else f"{database_name}@replica{replica}"
+        pool = self._pools.get(name)
+        if pool is None:
+            with self._pools_lock:
+                pool = self._pools.get(name)
+                if pool is None:
+                    params = (self.connection_params if replica is None else self.replicas[replica]).copy()
+                    params['database'] = database_name
+                    pool = ConnectionPool(params, query_hooks=self.query_hooks, **self.pool_options)
+                    self._pools[name] = pool
+        return pool
+
+    # --- REPLICA ROUTING ---
+
+    def start_request(self, read_primary=False):
+        """Resets the routing state for a new request; read_primary sends all of its reads to the primary."""
+        _read_primary.set(read_primary)
+        _wrote.set(False)
+
+    def wrote_in_request(self):
+        return _wrote.get()
+
+    def _choose_replica(self):
+        """Returns the index of the replica to read from, or None to read from the primary."""
+        if not self.replicas or _read_primary.get():
+            return None
+        self._start_health_checks()
+        now = time.monotonic()
+        healthy = [index for index, state in enumerate(self._replica_state) if state['down_until'] <= now]
+        if not healthy:
+            return None
+        if self.replica_strategy == 'least_latency':
+            return min(healthy, key=lambda index: self._replica_state[index]['latency'] or 0.0)
+        return healthy[next(self._round_robin) % len(healthy)]
+
+    def _mark_replica_down(self, replica, reason):
+        state = self._replica_state[replica]
+        state['failures'] += 1
+        if state['down_until'] <= time.monotonic():
+            logger.warning("Replica %d (%s) taken out of rotation: %s", replica, self.replicas[replica]['host'], reason)
+        state['down_until'] = time.monotonic() + self.replica_retry_interval
+
+    def _acquire(self, database_name, replica):
+        while replica is not None:
+            pool = self._get_pool(database_name, replica)
+            try:
+                return pool, pool.acquire(), replica
+            except pymysql.err.OperationalError as e:
+                # Only a failed connect counts against the replica; a PoolTimeoutError
+                # means this process's pool is busy, and is raised like the primary's.
+                self._mark_replica_down(replica, e)
+                replica = self._choose_replica()
+        pool = self._get_pool(database_name)
+        return pool, pool.acquire(), None
+
+    def check_replicas(self):
+        """Pings every replica, records its latency, and takes unreachable or lagging ones out of rotation."""
+        for index, state in enumerate(self._replica_state):
+            pool = self._get_pool('users', index)
+            started = time.perf_counter()
+            try:
+                connection = pool.acquire()
+            except Exception as e:
+                self._mark_replica_down(index, e)
+                continue
+            lag = None
+            try:
+                if self.max_replica_lag is not None:
+                    lag = self._replication_lag(connection)
+            except Exception as e:
+                pool.release(connection, discard=True)
+                self._mark_replica_down(index, e)
+                continue
+            pool.release(connection)
+            latency = time.perf_counter() - started
+            state['latency'] = latency if state['latency'] is None else 0.8 * state['latency'] + 0.2 * latency
+            if lag is not None and lag > self.max_replica_lag:
+                self._mark_replica_down(index, f"{lag}s behind the primary")
+            elif state['down_until']:
+                logger.info("Replica %d (%s) is back in rotation", index, self.replicas[index]['host'])
+                state['down_until'] = 0.0
+
+    def _replication_lag(self, connection):
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except pymysql.err.ProgrammingError:  # MySQL before 8.0.22
+                cursor.execute("SHOW SLAVE STATUS")
+            row = cursor.fetchone()
+        if not row:
+            return None
+        lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+        # NULL means replication is stopped, which is as stale as it gets.
+        return float('inf') if lag is None else lag
+
+    def _start_health_checks(self):
+        if self._health_checker is not None or not self.health_check_interval:
+            return
+        with self._pools_lock:
+            if self._health_checker is None:
+                self._health_checker = threading.Thread(target=self._health_check_loop, name='replica-health',
+                                                        daemon=True)
+                self._health_checker.start()
+
+    def _health_check_loop(self):
+        while True:
+            try:
+                self.check_replicas()
+            except Exception:
+                logger.exception("Replica health check failed")
+            time.sleep(self.health_check_interval)
+
+    def replica_status(self):
+        now = time.monotonic()
+        return [{'host': params['host'], 'port': params['port'], 'healthy': state['down_until'] <= now,
+                 'latency': state['latency'], 'failures': state['failures']}
+                for params, state in zip(self.replicas, self._replica_state)]
 
     @contextmanager
-    def get_connection(self, database_name):
-        connection = None
+    def get_connection(self, database_name, readonly=False, primary=False):
+        """Yields a pooled connection and commits when the block exits cleanly.
+
+        readonly=True allows the block to run on a replica, unless primary=True
+        asks for the primary's copy of the data; anything not readonly runs on the
+        primary and makes the rest of the request read from the primary too.
+        """
+        replica = self._choose_replica() if readonly and not primary else None
+        pool, connection, replica = self._acquire(database_name, replica)
+        broken = False
         try:
-            params = self.connection_params.copy()
-            params['database'] = database_name
-            connection = pymysql.connect(**params)
             yield connection
-        except Exception as e:
-            if connection:
+            connection.commit()
+        except BaseException as e:
+            # BaseException too: a generator closed mid-block (GeneratorExit) must not
+            # hand the pool a connection with an open transaction.
+            if isinstance(e, (pymysql.err.OperationalError, pymysql.err.InterfaceError)):
+                broken = True
+                if replica is not None:
+                    self._mark_replica_down(replica, e)
+            try:
                 connection.rollback()
-            raise e
+            except Exception:
+                broken = True
+            raise
         finally:
-            if connection:
-                connection.commit()
-                connection.close()
+            pool.release(connection, discard=broken)
+        if not readonly:
+            _wrote.set(True)
+            _read_primary.set(True)
+
+    def insert_chunk(self, database_name, sql, chunk, describe_error):
+        """Inserts a chunk of (row_number, params) in one transaction; returns (inserted, errors).
+
+        The chunk is sent as one batched executemany. If it violates a constraint,
+        the rows are retried one at a time in the same transaction (InnoDB only rolls
+        back the failing statement), so one bad row does not reject the rest.
+        """
+        errors = []
+        with self.get_connection(database_name) as conn:
+            with conn.cursor() as cursor:
+                try:
+                    cursor.executemany(sql, [params for _, params in chunk])
+                    return len(chunk), errors
+                except pymysql.err.IntegrityError:
+                    # executemany may have sent several statements; undo any that succeeded.
+                    conn.rollback()
+                inserted = 0
+                for row_number, params in chunk:
+                    try:
+                        cursor.execute(sql, params)
+                        inserted += 1
+                    except pymysql.err.IntegrityError as e:
+                        errors.append((row_number, describe_error(e)))
+        return inserted, errors
+
+    def stream_rows(self, database_name, sql, params=()):
+        """Yields rows one at a time from an unbuffered server-side cursor on a replica when there is one."""
+        with self.get_connection(database_name, readonly=True) as conn:
+            with conn.cursor(InstrumentedSSDictCursor) as cursor:
+                cursor.execute(sql, params)
+                for row in cursor:
+                    yield row
+
+    def warm_up(self, connections=2):
+        """Opens up to connections pooled connections per database ahead of the first requests."""
+        for database_name in ('users', 'courses'):
+            pool = self._get_pool(database_name)
+            opened = [pool.acquire() for _ in range(min(connections, pool.max_size))]
+            for connection in opened:
+                pool.release(connection)
+
+    def schema_ready(self):
+        """True once every migration has been applied; a positive answer is cached for the process."""
+        if self._schema_ready:
+            return True
+        try:
+            with self.get_connection('users') as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT MAX(version) AS version FROM schema_migrations")
+                    row = cursor.fetchone()
+        except pymysql.err.MySQLError:
+            return False
+        self._schema_ready = row['version'] is not None and row['version'] >= self.MIGRATIONS[-1][0]
+        return self._schema_ready
+
+    @contextmanager
+    def named_lock(self, name, timeout=0):
+        """Holds MySQL's GET_LOCK(name) for the block; yields whether it was acquired within timeout seconds."""
+        with self.get_connection('users') as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT GET_LOCK(%s, %s) AS acquired", (name, timeout))
+                acquired = cursor.fetchone()['acquired'] == 1
+                try:
+                    yield acquired
+                finally:
+                    if acquired:
+                        cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+
+    def add_query_hook(self, hook):
+        self.query_hooks.append(hook)
+
+    def pool_metrics(self):
+        return {name: pool.metrics() for name, pool in self._pools.items()}
+
+    def close_pools(self):
+        with self._pools_lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
 
     def init_databases(self):
         try:
@@ -62,6 +503,14 @@ class DatabaseManager:
                             UNIQUE KEY unique_enrollment (username, course_title)
                         )
                     """)
+                    cursor.execute("""
+                        CREATE TABLE IF NOT EXISTS sessions (
+                            sid VARCHAR(64) PRIMARY KEY,
+                            data MEDIUMTEXT NOT NULL,
+                            expires_at DOUBLE NOT NULL,
+                            INDEX idx_sessions_expires_at (expires_at)
+                        )
+                    """)
 
             with self.get_connection('courses') as conn:
                 with conn.cursor() as cursor:
@@ -76,12 +525,226 @@ class DatabaseManager:
                             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                         )
                     """)
+                    cursor.execute("""
+                        CREATE TABLE IF NOT EXISTS catalog_version (
+                            id TINYINT PRIMARY KEY,
+                            version BIGINT NOT NULL DEFAULT 0
+                        )
+                    """)
+                    cursor.execute("INSERT IGNORE INTO catalog_version (id, version) VALUES (1, 0)")
+
+            self.migrate()
         except Exception as e:
             print(f"Error during database initialization: {e}")
 
+    # --- SCHEMA MIGRATIONS ---
+
+    # (version, description, method). Applied in order by migrate() and recorded in
+    # users.schema_migrations. Each method checks the live schema first, so re-running
+    # one that was interrupted before it was recorded is safe.
+    MIGRATIONS = (
+        (1, "add user_courses.course_id and enrollment indexes", '_migrate_enrollment_keys'),
+        (2, "backfill user_courses.course_id", '_migrate_backfill_course_ids'),
+        (3, "index customers.created_at", '_migrate_customers_created_at_index'),
+        (4, "add enrollment and signup summary tables", '_migrate_analytics_tables'),
+        (5, "add maintenance job queue", '_migrate_maintenance_jobs'),
+        (6, "key enrollments on (username, course_id)", '_migrate_enrollment_unique_key'),
+    )
+
+    def migrate(self, batch_size=1000):
+        """Applies pending migrations; returns the versions applied.
+
+        A MySQL named lock keeps workers that start at the same time from running
+        the same migration twice.
+        """
+        applied = []
+        with self.get_connection('users') as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        version INT PRIMARY KEY,
+                        description VARCHAR(255) NOT NULL,
+                        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                cursor.execute("SELECT GET_LOCK('schema_migrations', 300) AS acquired")
+                if not cursor.fetchone()['acquired']:
+                    raise RuntimeError("Timed out waiting for another process to finish migrating.")
+                try:
+                    cursor.execute("SELECT version FROM schema_migrations")
+                    done = {row['version'] for row in cursor.fetchall()}
+                    for version, description, method in self.MIGRATIONS:
+                        if version in done:
+                            continue
+                        getattr(self, method)(batch_size)
+                        cursor.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                                       (version, description))
+                        conn.commit()
+                        applied.append(version)
+                        print(f"Applied migration {version}: {description}")
+                finally:
+                    cursor.execute("SELECT RELEASE_LOCK('schema_migrations')")
+        return applied
+
+    def _column_exists(self, cursor, table, column):
+        cursor.execute("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        """, (table, column))
+        return cursor.fetchone() is not None
+
+    def _index_exists(self, cursor, table, index):
+        cursor.execute("""
+            SELECT 1 FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """, (table, index))
+        return cursor.fetchone() is not None
+
+    def _migrate_enrollment_keys(self, batch_size):
+        # LOCK=NONE makes MySQL fail rather than block writes if the change cannot be done online.
+        with self.get_connection('users') as conn:
+            with conn.cursor() as cursor:
+                if not self._column_exists(cursor, 'user_courses', 'course_id'):
+                    cursor.execute("ALTER TABLE user_courses ADD COLUMN course_id INT NULL AFTER course_title, LOCK=NONE")
+                if not self._index_exists(cursor, 'user_courses', 'idx_user_courses_course_id'):
+                    cursor.execute("ALTER TABLE user_courses ADD INDEX idx_user_courses_course_id (course_id, username), "
+                                   "LOCK=NONE")
+                if not self._index_exists(cursor, 'user_courses', 'idx_user_courses_course_title'):
+                    cursor.execute("ALTER TABLE user_courses ADD INDEX idx_user_courses_course_title (course_title), "
+                                   "LOCK=NONE")
+
+    def _migrate_backfill_course_ids(self, batch_size):
+        """Fills course_id from the course title, one id range per transaction."""
+        with self.get_connection('users') as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT MIN(id) AS low, MAX(id) AS high FROM user_courses WHERE course_id IS NULL")
+                bounds = cursor.fetchone()
+        if bounds['low'] is None:
+            return
+        for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+            with self.get_connection('users') as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("""
+                        UPDATE user_courses uc
+                        JOIN courses.courseinfo c ON c.title = uc.course_title
+                        SET uc.course_id = c.id
+                        WHERE uc.id BETWEEN %s AND %s AND uc.course_id IS NULL
+                    """, (start, start + batch_size - 1))
+
+    def _migrate_customers_created_at_index(self, batch_size):
+        with self.get_connection('users') as conn:
+            with conn.cursor() as cursor:
+                if not self._index_exists(cursor, 'customers', 'idx_customers_created_at'):
+                    cursor.execute("ALTER TABLE customers ADD INDEX idx_customers_created_at (created_at), LOCK=NONE")
+
+    def _migrate_analytics_tables(self, batch_size):
+        with self.get_connection('users') as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS enrollment_counts (
+                        course_id INT PRIMARY KEY,
+                        enrollments INT NOT NULL DEFAULT 0,
+                        INDEX idx_enrollment_counts_popularity (enrollments, course_id)
+                    )
+                """)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS daily_signups (
+                        day DATE PRIMARY KEY,
+                        signups INT NOT NULL DEFAULT 0
+                    )
+                """)
+        AnalyticsManager(self).rollup()
+
+    def _migrate_maintenance_jobs(self, batch_size):
+        with self.get_connection('users') as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS maintenance_jobs (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        kind VARCHAR(32) NOT NULL,
+                        course_id INT NULL,
+                        old_title VARCHAR(255) NULL,
+                        new_title VARCHAR(255) NULL,
+                        status VARCHAR(16) NOT NULL DEFAULT 'pending',
+                        last_id INT NOT NULL DEFAULT 0,
+                        processed INT NOT NULL DEFAULT 0,
+                        error TEXT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        finished_at DOUBLE NULL,
+                        INDEX idx_maintenance_jobs_status (status, id),
+                        INDEX idx_maintenance_jobs_kind (kind, status)
+                    )
+                """)
+
+    def _migrate_enrollment_unique_key(self, batch_size):
+        # Titles are renamed and reused after a delete, so only the course id can
+        # tell two enrollments apart.
+        removed = 0
+        with self.get_connection('users') as conn:
+            with conn.cursor() as cursor:
+                if not self._index_exists(cursor, 'user_courses', 'unique_enrollment_course'):
+                    removed = cursor.execute("""
+                        DELETE uc FROM user_courses uc
+                        JOIN user_courses kept
+                          ON kept.username = uc.username AND kept.course_id = uc.course_id AND kept.id < uc.id
+                    """)
+                    cursor.execute("ALTER TABLE user_courses ADD UNIQUE KEY unique_enrollment_course "
+                                   "(username, course_id), LOCK=NONE")
+                if self._index_exists(cursor, 'user_courses', 'unique_enrollment'):
+                    cursor.execute("ALTER TABLE user_courses DROP INDEX unique_enrollment, LOCK=NONE")
+        if removed:
+            AnalyticsManager(self).rollup()
+
+
+# Sort keys accepted by list_users; each column is indexed, and id breaks ties.
+USER_SORT_COLUMNS = {'id': 'id', 'username': 'username', 'email': 'email', 'joined': 'created_at'}
+
+
+def _users_page_query(sort, descending, after, before, limit):
+    column = USER_SORT_COLUMNS.get(sort, 'id')
+    # Paging backwards scans the index in the opposite direction and reverses the rows afterwards.
+    scan_descending = descending != (before is not None)
+    sql = "SELECT id, username, email, image_path, created_at FROM customers"
+    params = []
+    value, _, last_id = (before or after or '').rpartition(':')
+    if last_id.isdigit():
+        sql += f" WHERE ({column}, id) {'<' if scan_descending else '>'} (%s, %s)"
+        params += [value, int(last_id)]
+    order = 'DESC' if scan_descending else 'ASC'
+    sql += f" ORDER BY {column} {order}, id {order} LIMIT %s"
+    params.append(limit + 1)
+    return sql, tuple(params)
+
+
+def _build_users_page(rows, sort, after, before, limit):
+    column = USER_SORT_COLUMNS.get(sort, 'id')
+    users = list(rows)
+    has_more = len(users) > limit
+    users = users[:limit]
+    if before:
+        users.reverse()
+    if not users:
+        return {'users': [], 'prev': None, 'next': None}
+    first = f"{users[0][column]}:{users[0]['id']}"
+    last = f"{users[-1][column]}:{users[-1]['id']}"
+    if before:
+        return {'users': users, 'prev': first if has_more else None, 'next': last}
+    return {'users': users, 'prev': first if after else None, 'next': last if has_more else None}
+
+
 class UserManager:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, password_hasher=None):
         self.db_manager = db_manager
+        self.password_hasher = password_hasher or PasswordHasher()
+        self._dummy_hash_value = None
+
+    @property
+    def _dummy_hash(self):
+        # Verified against when the username does not exist, so unknown and known
+        # usernames take the same time to reject. Hashed on first use to keep startup cheap.
+        if self._dummy_hash_value is None:
+            self._dummy_hash_value = self.password_hasher.hash("dummy-password")
+        return self._dummy_hash_value
 
     def _validate_username(self, username):
         if not re.match(r'^[a-zA-Z][a-zA-Z0-9_]{3,19}$', username):
@@ -99,7 +762,7 @@ class UserManager:
         return True, "Valid"
 
     def _hash_password(self, password):
-        return hashlib.sha256(password.encode()).hexdigest()
+        return self.password_hasher.hash(password)
 
     def create_user(self, username, email, password, confirm_password, image_path, security_question, security_answer):
         is_valid_user, _ = self._validate_username(username)
@@ -126,6 +789,10 @@ class UserManager:
                         INSERT INTO customers (username, email, password, image_path, security_question, security_answer)
                         VALUES (%s, %s, %s, %s, %s, %s)
                     """, (username, email, hashed_password, image_path, security_question, security_answer))
+                    cursor.execute("""
+                        INSERT INTO daily_signups (day, signups) VALUES (CURRENT_DATE, 1)
+                        ON DUPLICATE KEY UPDATE signups = signups + 1
+                    """)
             return True, "User created."
         except pymysql.err.IntegrityError as e:
             if 'username' in str(e):
@@ -134,23 +801,88 @@ class UserManager:
                 return False, "Email already in use."
             return False, "Database error."
 
+    def _describe_user_error(self, error):
+        if 'username' in str(error):
+            return "Username already taken."
+        if 'email' in str(error):
+            return "Email already in use."
+        return "Database error."
+
+    def bulk_create_users(self, rows, chunk_size=500):
+        """Imports (row_number, row) pairs in chunked transactions; returns (inserted, errors)."""
+        sql = """
+            INSERT INTO customers (username, email, password, image_path, security_question, security_answer)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """
+        inserted = 0
+        errors = []
+        chunk = []
+        for row_number, row in rows:
+            username = row.get('username') or ''
+            email = row.get('email') or ''
+            password = row.get('password') or ''
+            failed = None
+            for is_valid, message in (self._validate_username(username), self._validate_email(email),
+                                      self._validate_password(password)):
+                if not is_valid:
+                    failed = message
+                    break
+            if not failed and not row.get('security_answer'):
+                failed = "Security answer is required."
+            if failed:
+                errors.append((row_number, failed))
+                continue
+            chunk.append((row_number, (username, email, self._hash_password(password), row.get('image_path') or None,
+                                       row.get('security_question'), row['security_answer'])))
+            if len(chunk) >= chunk_size:
+                count, chunk_errors = self.db_manager.insert_chunk('users', sql, chunk, self._describe_user_error)
+                inserted += count
+                errors.extend(chunk_errors)
+                chunk = []
+        if chunk:
+            count, chunk_errors = self.db_manager.insert_chunk('users', sql, chunk, self._describe_user_error)
+            inserted += count
+            errors.extend(chunk_errors)
+        return inserted, errors
+
     def check_credentials(self, username, password):
-        hashed = self._hash_password(password)
         user = self.get_user(username)
-        return user and user['password'] == hashed
+        if not user:
+            self.password_hasher.verify(password, self._dummy_hash)
+            return False
+        if not self.password_hasher.verify(password, user['password']):
+            return False
+        if self.password_hasher.needs_rehash(user['password']):
+            with self.db_manager.get_connection('users') as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("UPDATE customers SET password = %s WHERE username = %s",
+                                   (self._hash_password(password), username))
+        return True
 
     def get_user(self, username):
-        with self.db_manager.get_connection('users') as conn:
+        with self.db_manager.get_connection('users', readonly=True) as conn:
             with conn.cursor() as cursor:
                 cursor.execute("SELECT * FROM customers WHERE username = %s", (username,))
                 return cursor.fetchone()
 
     def get_all_users(self):
-        with self.db_manager.get_connection('users') as conn:
+        with self.db_manager.get_connection('users', readonly=True) as conn:
             with conn.cursor() as cursor:
                 cursor.execute("SELECT id, username, email, image_path, created_at FROM customers")
                 return cursor.fetchall()
 
+    def list_users(self, sort='id', descending=False, after=None, before=None, limit=25):
+        """Returns one keyset-paginated page of customers ordered by a USER_SORT_COLUMNS key.
+
+        after/before are the 'next'/'prev' cursors of a previously returned page.
+        """
+        sql, params = _users_page_query(sort, descending, after, before, limit)
+        with self.db_manager.get_connection('users', readonly=True) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+        return _build_users_page(rows, sort, after, before, limit)
+
     def reset_password(self, username, security_answer, new_password):
         user = self.get_user(username)
         if not user or user['security_answer'] != security_answer:
@@ -192,20 +924,332 @@ class UserManager:
     def add_course_to_user(self, username, course_title):
         with self.db_manager.get_connection('users') as conn:
             with conn.cursor() as cursor:
+                cursor.execute("SELECT id FROM courses.courseinfo WHERE title = %s", (course_title,))
+                course = cursor.fetchone()
+                course_id = course['id'] if course else None
                 try:
-                    cursor.execute("INSERT INTO user_courses (username, course_title) VALUES (%s, %s)", (username, course_title))
+                    cursor.execute("INSERT INTO user_courses (username, course_title, course_id) VALUES (%s, %s, %s)",
+                                   (username, course_title, course_id))
                 except pymysql.err.IntegrityError:
-                    pass
+                    return
+                if course_id is not None:
+                    self._count_enrollments(cursor, [course_id])
 
-    def get_user_courses(self, username):
+    def _count_enrollments(self, cursor, course_ids):
+        """Adds one enrollment per id to the enrollment_counts summary, in the caller's transaction."""
+        cursor.executemany("""
+            INSERT INTO enrollment_counts (course_id, enrollments) VALUES (%s, 1)
+            ON DUPLICATE KEY UPDATE enrollments = enrollments + 1
+        """, [(course_id,) for course_id in course_ids])
+
+    def enroll_courses(self, username, course_titles):
+        """Enrolls username in the given courses in one transaction.
+
+        Returns (enrolled, duplicates, missing) lists of titles: newly enrolled,
+        already enrolled, and titles that are not in the catalog.
+        """
+        titles = list(dict.fromkeys(t for t in course_titles if t))
+        if not titles:
+            return [], [], []
+        placeholders = ", ".join(["%s"] * len(titles))
         with self.db_manager.get_connection('users') as conn:
+            with conn.cursor() as cursor:
+                # One round trip checks that each course exists and whether the user
+                # already has it. Shared locks keep the courses from being deleted
+                # until commit without making enrollments in one course queue up.
+                cursor.execute(f"""
+                    SELECT c.id, c.title, uc.id AS enrollment_id
+                    FROM courses.courseinfo c
+                    LEFT JOIN user_courses uc ON uc.course_id = c.id AND uc.username = %s
+                    WHERE c.title IN ({placeholders})
+                    FOR SHARE
+                """, (username, *titles))
+                rows = {row['title']: row for row in cursor.fetchall()}
+                missing = [t for t in titles if t not in rows]
+                new = [t for t in titles if t in rows and rows[t]['enrollment_id'] is None]
+                enrolled = []
+                if new:
+                    inserted = cursor.execute(
+                        "INSERT IGNORE INTO user_courses (username, course_title, course_id) VALUES "
+                        + ", ".join(["(%s, %s, %s)"] * len(new)),
+                        [value for title in new for value in (username, title, rows[title]['id'])]
+                    )
+                    enrolled = new
+                    if inserted == 0:
+                        enrolled = []
+                    elif inserted < len(new):
+                        # A concurrent request enrolled the user in some of these since the
+                        # check. This statement's rows have ids from lastrowid (the first id
+                        # it inserted) onwards; the other request's rows were there before.
+                        cursor.execute(f"""
+                            SELECT course_id FROM user_courses
+                            WHERE username = %s AND id >= %s AND course_id IN ({", ".join(["%s"] * len(new))})
+                        """, (username, cursor.lastrowid, *[rows[title]['id'] for title in new]))
+                        ours = {row['course_id'] for row in cursor.fetchall()}
+                        enrolled = [title for title in new if rows[title]['id'] in ours]
+                duplicates = [t for t in titles if t in rows and t not in enrolled]
+                if enrolled:
+                    self._count_enrollments(cursor, [rows[title]['id'] for title in enrolled])
+        return enrolled, duplicates, missing
+
+    def _describe_enrollment_error(self, error):
+        if 'unique_enrollment' in str(error) or 'Duplicate' in str(error):
+            return "Already enrolled."
+        if 'foreign key' in str(error).lower():
+            return "Unknown username."
+        return "Database error."
+
+    def bulk_add_courses_to_users(self, rows, course_manager, chunk_size=500):
+        """Imports (row_number, row) enrollment pairs in chunked transactions; returns (inserted, errors)."""
+        sql = "INSERT INTO user_courses (username, course_title, course_id) VALUES (%s, %s, %s)"
+        inserted = 0
+        errors = []
+        chunk = []
+
+        def flush():
+            course_ids = {course['title']: course['id']
+                          for course in course_manager.get_courses([params[1] for _, params in chunk])}
+            valid = []
+            for row_number, params in chunk:
+                if params[1] in course_ids:
+                    valid.append((row_number, params + (course_ids[params[1]],)))
+                else:
+                    errors.append((row_number, f"Unknown course '{params[1]}'."))
+            if not valid:
+                return 0
+            count, chunk_errors = self.db_manager.insert_chunk('users', sql, valid, self._describe_enrollment_error)
+            errors.extend(chunk_errors)
+            return count
+
+        for row_number, row in rows:
+            username = row.get('username')
+            course_title = row.get('course_title')
+            if not username or not course_title:
+                errors.append((row_number, "username and course_title are required."))
+                continue
+            chunk.append((row_number, (username, course_title)))
+            if len(chunk) >= chunk_size:
+                inserted += flush()
+                chunk = []
+        if chunk:
+            inserted += flush()
+        return inserted, errors
+
+    def get_user_courses(self, username):
+        with self.db_manager.get_connection('users', readonly=True) as conn:
             with conn.cursor() as cursor:
                 cursor.execute("SELECT course_title FROM user_courses WHERE username = %s", (username,))
                 return cursor.fetchall()
 
+    def get_enrolled_courses(self, username):
+        with self.db_manager.get_connection('users', readonly=True) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT c.* FROM user_courses uc
+                    JOIN courses.courseinfo c ON c.id = uc.course_id
+                    WHERE uc.username = %s
+                    ORDER BY uc.enrolled_at, uc.id
+                """, (username,))
+                return cursor.fetchall()
+
+
+def _courses_page_query(after, before, limit, snippet_length):
+    sql = "SELECT id, title, LEFT(description, %s) AS description, photo_path, watch_hours, class_day FROM courseinfo"
+    params = [snippet_length + 1]
+    if before is not None:
+        sql += " WHERE id < %s ORDER BY id DESC LIMIT %s"
+        params += [before, limit + 1]
+    else:
+        if after is not None:
+            sql += " WHERE id > %s"
+            params.append(after)
+        sql += " ORDER BY id LIMIT %s"
+        params.append(limit + 1)
+    return sql, tuple(params)
+
+
+def _build_courses_page(rows, after, before, limit, snippet_length):
+    courses = list(rows)
+    has_more = len(courses) > limit
+    courses = courses[:limit]
+    if before is not None:
+        courses.reverse()
+    for course in courses:
+        description = course['description']
+        if description and len(description) > snippet_length:
+            course['description'] = description[:snippet_length].rstrip() + "…"
+    if not courses:
+        return {'courses': [], 'prev': None, 'next': None}
+    if before is not None:
+        return {'courses': courses, 'prev': courses[0]['id'] if has_more else None, 'next': courses[-1]['id']}
+    return {'courses': courses, 'prev': courses[0]['id'] if after is not None else None,
+            'next': courses[-1]['id'] if has_more else None}
+
+
+class CatalogCache:
+    """LRU-bounded, TTL-expiring cache for course catalog reads."""
+
+    def __init__(self, max_entries=256, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return _MISSING
+
+    def set(self, key, value, generation):
+        with self._lock:
+            # A write invalidated the catalog while this value was being read.
+            if generation != self.generation:
+                return
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'invalidations': self.invalidations,
+                'version': self.version,
+            }
+
+
 class CourseManager:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, cache_size=256, cache_ttl=60, version_check_interval=None):
         self.db_manager = db_manager
+        self.cache = CatalogCache(max_entries=cache_size, ttl=cache_ttl)
+        # When set, the catalog_version stamp is polled at most this often (seconds)
+        # so that writes made by other worker processes invalidate this cache too.
+        self.version_check_interval = version_check_interval
+        self._last_version_check = 0.0
+        self.search_index = CourseSearchIndex()
+        self._search_index_version = None
+        self._search_index_thread = None
+        self._search_index_lock = threading.Lock()
+        self._primary_reads_until = 0.0
+
+    def _read_primary(self):
+        # For a moment after a write, read the primary so a lagging replica cannot
+        # refill the cache with the rows the write just replaced.
+        return time.monotonic() < self._primary_reads_until
+
+    def _check_version(self):
+        if self.version_check_interval is None:
+            return
+        now = time.monotonic()
+        if now - self._last_version_check < self.version_check_interval:
+            return
+        self._last_version_check = now
+        with self.db_manager.get_connection('courses', readonly=True, primary=self._read_primary()) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT version FROM catalog_version WHERE id = 1")
+                row = cursor.fetchone()
+        version = row['version'] if row else None
+        if version != self.cache.version:
+            self.cache.clear()
+            self.cache.version = version
+
+    def _bump_version(self, cursor):
+        """Bumps the catalog_version stamp and returns the new version.
+
+        Always bumped, so processes that do poll (the app's workers) see writes
+        from managers that do not, such as bulk.py.
+        """
+        cursor.execute("UPDATE catalog_version SET version = version + 1 WHERE id = 1")
+        cursor.execute("SELECT version FROM catalog_version WHERE id = 1")
+        row = cursor.fetchone()
+        return row['version'] if row else None
+
+    def _ensure_search_index(self):
+        self._check_version()
+        if not self.search_index.built:
+            self._rebuild_search_index()
+        elif self._search_index_version != self.cache.version:
+            # Another process changed the catalog: keep serving the current index
+            # while a background thread reloads it.
+            self._start_search_index_rebuild()
+
+    def _rebuild_search_index(self):
+        version = self.cache.version
+        with self.db_manager.get_connection('courses', readonly=True, primary=self._read_primary()) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT title, description FROM courseinfo")
+                self.search_index.rebuild(cursor.fetchall())
+        self._search_index_version = version
+
+    def _start_search_index_rebuild(self):
+        with self._search_index_lock:
+            if self._search_index_thread is not None and self._search_index_thread.is_alive():
+                return
+            self._search_index_thread = threading.Thread(target=self._rebuild_search_index_in_background,
+                                                         name='search-index-rebuild', daemon=True)
+            self._search_index_thread.start()
+
+    def _rebuild_search_index_in_background(self):
+        try:
+            self._rebuild_search_index()
+        except Exception:
+            logger.exception("Rebuilding the course search index failed")
+
+    def search_courses(self, query, limit=10):
+        self._ensure_search_index()
+        return self.get_courses(self.search_index.search(query, limit=limit))
+
+    def autocomplete_courses(self, prefix, limit=8):
+        self._ensure_search_index()
+        return self.search_index.autocomplete(prefix, limit=limit)
+
+    def catalog_version(self):
+        """Returns a token that changes whenever this process sees the catalog change."""
+        self._check_version()
+        return self.cache.version, self.cache.generation
+
+    def invalidate_cache(self, written_version=None):
+        """Drops cached catalog reads after a write.
+
+        written_version is the stamp this process's own write produced. When it
+        directly follows the version already seen, no other process wrote in
+        between, so it is adopted without a poll and the search index, which the
+        write already updated in place, is not rebuilt.
+        """
+        self.cache.clear()
+        if written_version is not None and self.cache.version is not None \
+                and written_version == self.cache.version + 1:
+            if self._search_index_version == self.cache.version:
+                self._search_index_version = written_version
+            self.cache.version = written_version
+        self._primary_reads_until = time.monotonic() + getattr(self.db_manager, 'replica_stickiness', 0)
+
+    def cache_stats(self):
+        return self.cache.stats()
 
     def create_course(self, title, description, photo_path, watch_hours, class_day):
         with self.db_manager.get_connection('courses') as conn:
@@ -214,18 +1258,124 @@ class CourseManager:
                     INSERT INTO courseinfo (title, description, photo_path, watch_hours, class_day)
                     VALUES (%s, %s, %s, %s, %s)
                 """, (title, description, photo_path, watch_hours, class_day))
+                cursor.execute("INSERT IGNORE INTO users.enrollment_counts (course_id, enrollments) VALUES (%s, 0)",
+                               (cursor.lastrowid,))
+                version = self._bump_version(cursor)
+        self.invalidate_cache(version)
+        if self.search_index.built:
+            self.search_index.add(title, description)
 
     def get_course(self, title):
-        with self.db_manager.get_connection('courses') as conn:
+        self._check_version()
+        key = ('course', title)
+        course = self.cache.get(key)
+        if course is not _MISSING:
+            return course
+        generation = self.cache.generation
+        with self.db_manager.get_connection('courses', readonly=True, primary=self._read_primary()) as conn:
             with conn.cursor() as cursor:
                 cursor.execute("SELECT * FROM courseinfo WHERE title = %s", (title,))
-                return cursor.fetchone()
+                course = cursor.fetchone()
+        self.cache.set(key, course, generation)
+        return course
+
+    def get_courses(self, titles):
+        titles = list(dict.fromkeys(t for t in titles if t))
+        if not titles:
+            return []
+        self._check_version()
+        found = {}
+        missing = []
+        for title in titles:
+            course = self.cache.get(('course', title))
+            if course is _MISSING:
+                missing.append(title)
+            else:
+                found[title] = course
+        if missing:
+            generation = self.cache.generation
+            placeholders = ", ".join(["%s"] * len(missing))
+            with self.db_manager.get_connection('courses', readonly=True, primary=self._read_primary()) as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(f"SELECT * FROM courseinfo WHERE title IN ({placeholders})", tuple(missing))
+                    rows = {row['title']: row for row in cursor.fetchall()}
+            for title in missing:
+                found[title] = rows.get(title)
+                self.cache.set(('course', title), found[title], generation)
+        return [found[title] for title in titles if found[title]]
 
     def get_all_courses(self):
-        with self.db_manager.get_connection('courses') as conn:
+        self._check_version()
+        courses = self.cache.get(('all',))
+        if courses is not _MISSING:
+            return courses
+        generation = self.cache.generation
+        with self.db_manager.get_connection('courses', readonly=True, primary=self._read_primary()) as conn:
             with conn.cursor() as cursor:
                 cursor.execute("SELECT * FROM courseinfo")
-                return cursor.fetchall()
+                courses = cursor.fetchall()
+        self.cache.set(('all',), courses, generation)
+        return courses
+
+    def list_courses(self, after=None, before=None, limit=12, snippet_length=200):
+        """Returns one keyset-paginated page of courses with a truncated description."""
+        self._check_version()
+        key = ('page', after, before, limit, snippet_length)
+        page = self.cache.get(key)
+        if page is not _MISSING:
+            return page
+        generation = self.cache.generation
+        sql, params = _courses_page_query(after, before, limit, snippet_length)
+        with self.db_manager.get_connection('courses', readonly=True, primary=self._read_primary()) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+        page = _build_courses_page(rows, after, before, limit, snippet_length)
+        self.cache.set(key, page, generation)
+        return page
+
+    def bulk_create_courses(self, rows, chunk_size=500):
+        """Imports (row_number, row) pairs in chunked transactions; returns (inserted, errors)."""
+        sql = """
+            INSERT INTO courseinfo (title, description, photo_path, watch_hours, class_day)
+            VALUES (%s, %s, %s, %s, %s)
+        """
+        inserted = 0
+        errors = []
+        chunk = []
+
+        def flush():
+            count, chunk_errors = self.db_manager.insert_chunk(
+                'courses', sql, chunk, lambda e: "Course already exists." if 'title' in str(e) else "Database error."
+            )
+            errors.extend(chunk_errors)
+            return count
+
+        for row_number, row in rows:
+            title = (row.get('title') or '').strip().lower()
+            if not title:
+                errors.append((row_number, "Title is required."))
+                continue
+            watch_hours = row.get('watch_hours')
+            try:
+                watch_hours = int(watch_hours) if watch_hours not in (None, '') else None
+            except (TypeError, ValueError):
+                errors.append((row_number, "watch_hours must be a whole number."))
+                continue
+            chunk.append((row_number, (title, row.get('description'), row.get('photo_path') or None,
+                                       watch_hours, row.get('class_day'))))
+            if len(chunk) >= chunk_size:
+                inserted += flush()
+                chunk = []
+        if chunk:
+            inserted += flush()
+        if inserted:
+            with self.db_manager.get_connection('courses') as conn:
+                with conn.cursor() as cursor:
+                    version = self._bump_version(cursor)
+            self.invalidate_cache(version)
+            self.search_index.built = False
+        return inserted, errors
 
     def update_course(self, title, description, photo_path, watch_hours, class_day):
         with self.db_manager.get_connection('courses') as conn:
@@ -237,14 +1387,136 @@ class CourseManager:
                     sql = "UPDATE courseinfo SET description = %s, watch_hours = %s, class_day = %s WHERE title = %s"
                     params = (description, watch_hours, class_day, title)
                 cursor.execute(sql, params)
+                version = self._bump_version(cursor)
+        self.invalidate_cache(version)
+        if self.search_index.built:
+            self.search_index.add(title, description)
+
+    def _queue_job(self, cursor, kind, course_id, old_title, new_title=None):
+        # Enrollments live in the users database, out of reach of a foreign key; the
+        # maintenance worker (maintenance.py) applies the change to them in batches.
+        cursor.execute("INSERT INTO users.maintenance_jobs (kind, course_id, old_title, new_title) "
+                       "VALUES (%s, %s, %s, %s)", (kind, course_id, old_title, new_title))
+
+    def rename_course(self, title, new_title):
+        """Renames a course; returns (success, message).
+
+        Enrollment reads join on the course id and see the new title at once;
+        the copies in user_courses.course_title are updated by a maintenance job.
+        """
+        try:
+            with self.db_manager.get_connection('courses') as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT id, description FROM courseinfo WHERE title = %s", (title,))
+                    course = cursor.fetchone()
+                    if course is None:
+                        return False, f"Course '{title}' not found."
+                    cursor.execute("UPDATE courseinfo SET title = %s WHERE id = %s", (new_title, course['id']))
+                    self._queue_job(cursor, 'rename_course', course['id'], title, new_title)
+                    version = self._bump_version(cursor)
+        except pymysql.err.IntegrityError:
+            return False, f"A course named '{new_title}' already exists."
+        self.invalidate_cache(version)
+        self.search_index.remove(title)
+        if self.search_index.built:
+            self.search_index.add(new_title, course['description'])
+        return True, f"Course renamed to '{new_title}'."
 
     def delete_course(self, title):
         with self.db_manager.get_connection('courses') as conn:
             with conn.cursor() as cursor:
-                cursor.execute("DELETE FROM courseinfo WHERE title = %s", (title,))
+                cursor.execute("SELECT id FROM courseinfo WHERE title = %s", (title,))
+                course = cursor.fetchone()
+                if course is None:
+                    return
+                cursor.execute("DELETE FROM users.enrollment_counts WHERE course_id = %s", (course['id'],))
+                cursor.execute("DELETE FROM courseinfo WHERE id = %s", (course['id'],))
+                self._queue_job(cursor, 'delete_course', course['id'], title)
+                version = self._bump_version(cursor)
+        self.invalidate_cache(version)
+        self.search_index.remove(title)
+
+
+class AnalyticsManager:
+    """Enrollment and signup dashboards read from summary tables.
+
+    enrollment_counts and daily_signups are kept current by the UserManager and
+    CourseManager write paths, so every read here touches a bounded number of
+    summary rows however large customers and user_courses grow. rollup()
+    recomputes both from the base tables after bulk imports or to repair drift.
+    """
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    def totals(self):
+        with self.db_manager.get_connection('users', readonly=True) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT COALESCE(SUM(signups), 0) AS students FROM daily_signups")
+                students = cursor.fetchone()['students']
+                cursor.execute("SELECT COUNT(*) AS courses, COALESCE(SUM(enrollments), 0) AS enrollments "
+                               "FROM enrollment_counts")
+                row = cursor.fetchone()
+        return {'students': int(students), 'courses': row['courses'], 'enrollments': int(row['enrollments'])}
+
+    def signups_per_day(self, days=30):
+        """Returns [{'day', 'signups'}] for the last days days, oldest first; days without signups are omitted."""
+        since = datetime.date.today() - datetime.timedelta(days=days - 1)
+        with self.db_manager.get_connection('users', readonly=True) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT day, signups FROM daily_signups WHERE day >= %s ORDER BY day", (since,))
+                return cursor.fetchall()
+
+    def course_enrollments(self, after=None, limit=20):
+        """Returns one page of courses by enrollment count, most popular first.
+
+        after is the 'next' cursor of the previous page.
+        """
+        sql = """
+            SELECT ec.course_id, c.title, ec.enrollments
+            FROM enrollment_counts ec
+            JOIN courses.courseinfo c ON c.id = ec.course_id
+        """
+        params = []
+        enrollments, _, course_id = (after or '').partition(':')
+        if enrollments.isdigit() and course_id.isdigit():
+            sql += " WHERE (ec.enrollments, ec.course_id) < (%s, %s)"
+            params += [int(enrollments), int(course_id)]
+        sql += " ORDER BY ec.enrollments DESC, ec.course_id DESC LIMIT %s"
+        params.append(limit + 1)
+        with self.db_manager.get_connection('users', readonly=True) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, tuple(params))
+                courses = cursor.fetchall()
+        has_more = len(courses) > limit
+        courses = courses[:limit]
+        last = courses[-1] if courses else None
+        return {'courses': courses, 'next': f"{last['enrollments']}:{last['course_id']}" if has_more else None}
+
+    def most_popular_courses(self, limit=10):
+        return self.course_enrollments(limit=limit)['courses']
+
+    def rollup(self):
+        """Recomputes both summary tables from customers, user_courses and courseinfo in one transaction."""
+        with self.db_manager.get_connection('users') as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM enrollment_counts")
+                cursor.execute("""
+                    INSERT INTO enrollment_counts (course_id, enrollments)
+                    SELECT c.id, COUNT(uc.id)
+                    FROM courses.courseinfo c
+                    LEFT JOIN user_courses uc ON uc.course_id = c.id
+                    GROUP BY c.id
+                """)
+                cursor.execute("DELETE FROM daily_signups")
+                cursor.execute("""
+                    INSERT INTO daily_signups (day, signups)
+                    SELECT DATE(created_at), COUNT(*) FROM customers GROUP BY DATE(created_at)
+                """)
 
 
 if __name__ == "__main__":
     print("Attempting to initialize databases...")
     db_manager = DatabaseManager()
+    db_manager.init_databases()
     print("Database initialization process finished.")
\ No newline at end of file
@@ -0,0 +1,225 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import Response, before_render_template, g, has_request_context, request, template_rendered
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+    def prometheus_lines(self, name, labels):
+        label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+        prefix = label_text + "," if label_text else ""
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{prefix}le="+Inf"}} {self.total}'
+        yield f"{name}_sum{{{label_text}}} {self.sum:.6f}"
+        yield f"{name}_count{{{label_text}}} {self.total}"
+
+
+class RequestMetrics:
+    """Per-request timing of SQL, template rendering and the whole request.
+
+    Every request records its query count, rows, database time and render time
+    into per-endpoint histograms served at /metrics in Prometheus text format,
+    adds a Server-Timing header, and logs one structured line (at WARNING when
+    slow). Statements repeated N_PLUS_ONE_THRESHOLD times in one request are
+    flagged as a likely N+1. A PROFILE_SAMPLE_RATE share of requests runs under
+    cProfile, and the profile is kept when the request turns out to be slow.
+    """
+
+    def __init__(self, app=None, db_manager=None):
+        self._lock = threading.Lock()
+        self.request_durations = defaultdict(lambda: Histogram(DURATION_BUCKETS))
+        self.db_durations = defaultdict(lambda: Histogram(DURATION_BUCKETS))
+        self.render_durations = defaultdict(lambda: Histogram(DURATION_BUCKETS))
+        self.query_counts = defaultdict(lambda: Histogram(QUERY_COUNT_BUCKETS))
+        self.rows = Counter()
+        self.n_plus_one = Counter()
+        self.collectors = []
+        if app is not None:
+            self.init_app(app, db_manager)
+
+    def init_app(self, app, db_manager=None):
+        app.config.setdefault('SLOW_REQUEST_THRESHOLD', 0.5)
+        app.config.setdefault('PROFILE_SAMPLE_RATE', 0.0)
+        app.config.setdefault('PROFILE_DIR', None)
+        app.config.setdefault('N_PLUS_ONE_THRESHOLD', 5)
+        self.app = app
+        if db_manager is not None:
+            self.watch_database(db_manager)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def watch_database(self, db_manager):
+        """Records db_manager's statements per request and exports its pool gauges."""
+        db_manager.add_query_hook(self._record_query)
+        self.add_collector(lambda: _pool_samples(db_manager))
+
+    def add_collector(self, collector):
+        """Registers a callable returning (name, labels, value) gauge samples for /metrics."""
+        self.collectors.append(collector)
+
+    # --- per-request recording ---
+
+    def _before_request(self):
+        g.request_metrics = {
+            'started': time.perf_counter(),
+            'queries': 0,
+            'rows': 0,
+            'db_time': 0.0,
+            'render_time': 0.0,
+            'render_started': [],
+            'statements': Counter(),
+        }
+        if random.random() < self.app.config['PROFILE_SAMPLE_RATE']:
+            g.request_profiler = cProfile.Profile()
+            g.request_profiler.enable()
+
+    def _record_query(self, database, sql, rowcount, seconds):
+        if not has_request_context():
+            return
+        metrics = g.get('request_metrics')
+        if metrics is None:
+            return
+        metrics['queries'] += 1
+        metrics['rows'] += max(rowcount or 0, 0)
+        metrics['db_time'] += seconds
+        metrics['statements'][" ".join(sql.split())] += 1
+
+    def _before_render(self, sender, template, context, **extra):
+        metrics = g.get('request_metrics')
+        if metrics is not None:
+            metrics['render_started'].append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        metrics = g.get('request_metrics')
+        if metrics is not None and metrics['render_started']:
+            metrics['render_time'] += time.perf_counter() - metrics['render_started'].pop()
+
+    def _after_request(self, response):
+        metrics = g.pop('request_metrics', None)
+        if metrics is None:
+            return response
+        profiler = g.pop('request_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+        duration = time.perf_counter() - metrics['started']
+        endpoint = request.endpoint or 'unknown'
+
+        with self._lock:
+            self.request_durations[endpoint].observe(duration)
+            self.db_durations[endpoint].observe(metrics['db_time'])
+            self.render_durations[endpoint].observe(metrics['render_time'])
+            self.query_counts[endpoint].observe(metrics['queries'])
+            self.rows[endpoint] += metrics['rows']
+
+        response.headers['Server-Timing'] = (
+            f"db;dur={metrics['db_time'] * 1000:.1f}, "
+            f"render;dur={metrics['render_time'] * 1000:.1f}, "
+            f"total;dur={duration * 1000:.1f}"
+        )
+
+        repeated = [(sql, count) for sql, count in metrics['statements'].items()
+                    if count >= self.app.config['N_PLUS_ONE_THRESHOLD']]
+        for sql, count in repeated:
+            with self._lock:
+                self.n_plus_one[endpoint] += 1
+            self.app.logger.warning("Possible N+1 in %s: %d executions of %s", endpoint, count, sql)
+
+        slow = duration >= self.app.config['SLOW_REQUEST_THRESHOLD']
+        log_line = json.dumps({
+            'endpoint': endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'db_ms': round(metrics['db_time'] * 1000, 2),
+            'render_ms': round(metrics['render_time'] * 1000, 2),
+            'queries': metrics['queries'],
+            'rows': metrics['rows'],
+        })
+        if slow:
+            self.app.logger.warning("slow request %s", log_line)
+            if profiler is not None:
+                self._save_profile(profiler, endpoint)
+        else:
+            self.app.logger.info("request %s", log_line)
+        return response
+
+    def _save_profile(self, profiler, endpoint):
+        profile_dir = self.app.config['PROFILE_DIR']
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+            path = os.path.join(profile_dir, f"{endpoint}-{int(time.time() * 1000)}.prof")
+            profiler.dump_stats(path)
+            self.app.logger.warning("Profile of slow %s request saved to %s", endpoint, path)
+            return
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(25)
+        self.app.logger.warning("Profile of slow %s request:\n%s", endpoint, output.getvalue())
+
+    # --- exposition ---
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            for name, histograms, help_text in (
+                ('http_request_duration_seconds', self.request_durations, "Request latency by endpoint."),
+                ('db_time_per_request_seconds', self.db_durations, "Time spent in SQL per request."),
+                ('template_render_seconds', self.render_durations, "Time spent rendering templates per request."),
+                ('db_queries_per_request', self.query_counts, "SQL statements executed per request."),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for endpoint, histogram in sorted(histograms.items()):
+                    lines.extend(histogram.prometheus_lines(name, {'endpoint': endpoint}))
+            for name, counter, help_text in (
+                ('db_rows_total', self.rows, "Rows returned or affected by SQL, by endpoint."),
+                ('n_plus_one_warnings_total', self.n_plus_one, "Requests flagged as a likely N+1."),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for endpoint, value in sorted(counter.items()):
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {value}')
+        for collector in self.collectors:
+            for name, labels, value in collector():
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def metrics_view(self):
+        return Response(self.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+def _pool_samples(db_manager):
+    for database, metrics in db_manager.pool_metrics().items():
+        for key, value in metrics.items():
+            yield f"db_pool_{key}", {'database': database}, value
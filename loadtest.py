@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+
+async def _worker(host, port, target, requests, latencies, errors, deadline):
+    reader = writer = None
+    request = f"GET {target} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode()
+    while True:
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        if deadline is None:
+            if requests[0] <= 0:
+                break
+            requests[0] -= 1
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await _read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors.append(status)
+            if not keep_alive:
+                writer.close()
+                reader = writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError) as exc:
+            errors.append(type(exc).__name__)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("server closed the connection")
+    version, status = status_line.split()[:2]
+    keep_alive = version == b"HTTP/1.1"
+    length = None
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode('latin-1').partition(":")
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+        elif name == 'connection':
+            keep_alive = 'close' not in value.lower()
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return int(status), keep_alive
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run(url, concurrency=100, requests=1000, duration=None):
+    """Drives GET url from concurrency keep-alive connections; returns a result summary."""
+    parts = urlsplit(url)
+    target = parts.path or "/"
+    if parts.query:
+        target += "?" + parts.query
+    latencies, errors = [], []
+    remaining = [requests]
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+    await asyncio.gather(*[
+        _worker(parts.hostname, parts.port or 80, target, remaining, latencies, errors, deadline)
+        for _ in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'url': url,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': _percentile(latencies, 0.50) * 1000,
+        'p95_ms': _percentile(latencies, 0.95) * 1000,
+        'p99_ms': _percentile(latencies, 0.99) * 1000,
+    }
+
+
+def _print(results):
+    print(f"{'url':<40}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for r in results:
+        print(f"{r['url']:<40}{r['requests']:>10}{r['errors']:>8}{r['rps']:>10.1f}"
+              f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP load test; pass two URLs to compare the sync and async servers.")
+    parser.add_argument("urls", nargs="+", help="e.g. http://127.0.0.1:8888/ http://127.0.0.1:8000/")
+    parser.add_argument("--concurrency", type=int, default=100, help="open keep-alive connections")
+    parser.add_argument("--requests", type=int, default=1000, help="total requests per URL")
+    parser.add_argument("--duration", type=float, default=None, help="run each URL for this many seconds instead")
+    args = parser.parse_args()
+    _print([asyncio.run(run(url, args.concurrency, args.requests, args.duration)) for url in args.urls])
@@ -0,0 +1,215 @@
+import logging
+import threading
+import time
+from collections import Counter
+
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+
+class MaintenanceWorker:
+    """Carries course deletes and renames over to the users database.
+
+    CourseManager.delete_course and rename_course queue a job in
+    users.maintenance_jobs in the same transaction as the course change. The
+    worker runs each job in batches of batch_size enrollment rows and commits
+    its position with every batch, so an interrupted job resumes where it
+    stopped. Every reconcile_interval seconds it also queues a chunked scan of
+    user_courses that removes enrollments whose course is gone and repairs
+    stale course titles. One process at a time runs jobs (MySQL named lock).
+    """
+
+    JOB_STATUSES = ('pending', 'running')
+
+    def __init__(self, db_manager, batch_size=500, interval=30, reconcile_interval=3600, pause=0.05):
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.interval = interval
+        self.reconcile_interval = reconcile_interval
+        # Seconds to sleep between batches, so a large cascade never monopolises the primary.
+        self.pause = pause
+        self.rows = Counter()
+        self.jobs_done = 0
+        self.jobs_failed = 0
+        self.pending_jobs = 0
+        self.last_run = 0.0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts the background thread that runs jobs every interval seconds, once per process."""
+        if self._thread is not None or not self.interval:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run_loop, name='maintenance-worker', daemon=True)
+                self._thread.start()
+
+    def _run_loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Maintenance run failed")
+
+    def run_once(self):
+        """Queues a reconcile scan if one is due, then runs every queued job.
+
+        Returns the number of jobs finished, or None if another process is
+        running them.
+        """
+        with self.db_manager.named_lock('maintenance_jobs') as acquired:
+            if not acquired:
+                return None
+            self._queue_reconcile_if_due()
+            finished = 0
+            while True:
+                job = self._next_job()
+                if job is None:
+                    break
+                self._run_job(job)
+                finished += 1
+        self.last_run = time.time()
+        return finished
+
+    def _queue_reconcile_if_due(self):
+        with self.db_manager.get_connection('users') as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT MAX(finished_at) AS finished, COUNT(finished_at) AS runs, COUNT(*) AS jobs
+                    FROM maintenance_jobs WHERE kind = 'reconcile'
+                """)
+                row = cursor.fetchone()
+                # A reconcile job without finished_at is still queued or running.
+                if row['jobs'] > row['runs']:
+                    return
+                if row['finished'] is not None and row['finished'] > time.time() - self.reconcile_interval:
+                    return
+                cursor.execute("INSERT INTO maintenance_jobs (kind) VALUES ('reconcile')")
+
+    def _next_job(self):
+        with self.db_manager.get_connection('users') as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) AS pending FROM maintenance_jobs WHERE status IN (%s, %s)",
+                               self.JOB_STATUSES)
+                self.pending_jobs = cursor.fetchone()['pending']
+                cursor.execute("SELECT * FROM maintenance_jobs WHERE status IN (%s, %s) ORDER BY id LIMIT 1",
+                               self.JOB_STATUSES)
+                return cursor.fetchone()
+
+    def _run_job(self, job):
+        step = {
+            'delete_course': self._delete_enrollments,
+            'rename_course': self._rename_enrollments,
+            'reconcile': self._reconcile_chunk,
+        }.get(job['kind'])
+        last_id = job['last_id']
+        try:
+            if step is None:
+                raise ValueError(f"Unknown maintenance job kind {job['kind']!r}")
+            while last_id is not None:
+                with self.db_manager.get_connection('users') as conn:
+                    with conn.cursor() as cursor:
+                        last_id, count = step(cursor, job, last_id)
+                        # The batch and the job's new position commit together.
+                        cursor.execute("""
+                            UPDATE maintenance_jobs
+                            SET status = %s, last_id = COALESCE(%s, last_id), processed = processed + %s,
+                                finished_at = %s
+                            WHERE id = %s
+                        """, ('running' if last_id is not None else 'done', last_id, count,
+                              None if last_id is not None else time.time(), job['id']))
+                if last_id is not None and self.pause:
+                    time.sleep(self.pause)
+        except pymysql.err.OperationalError:
+            # Lost connection, deadlock or lock wait: the job resumes from its last batch next run.
+            raise
+        except Exception as e:
+            logger.exception("Maintenance job %d (%s) failed", job['id'], job['kind'])
+            with self.db_manager.get_connection('users') as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("UPDATE maintenance_jobs SET status = 'failed', error = %s, finished_at = %s "
+                                   "WHERE id = %s", (str(e), time.time(), job['id']))
+            self.jobs_failed += 1
+            return
+        self.jobs_done += 1
+        logger.info("Maintenance job %d (%s) finished", job['id'], job['kind'])
+
+    def _enrollment_batch(self, cursor, course_id, last_id):
+        cursor.execute("SELECT id FROM user_courses WHERE course_id = %s AND id > %s ORDER BY id LIMIT %s",
+                       (course_id, last_id, self.batch_size))
+        return [row['id'] for row in cursor.fetchall()]
+
+    def _next_position(self, ids):
+        # A short batch means the scan reached the end.
+        return ids[-1] if len(ids) == self.batch_size else None
+
+    def _delete_enrollments(self, cursor, job, last_id):
+        ids = self._enrollment_batch(cursor, job['course_id'], last_id)
+        if ids:
+            cursor.execute(f"DELETE FROM user_courses WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+            self.rows['enrollments_deleted'] += len(ids)
+        return self._next_position(ids), len(ids)
+
+    def _rename_enrollments(self, cursor, job, last_id):
+        ids = self._enrollment_batch(cursor, job['course_id'], last_id)
+        if ids:
+            cursor.execute(f"UPDATE user_courses SET course_title = %s WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                           (job['new_title'], *ids))
+            self.rows['titles_renamed'] += len(ids)
+        return self._next_position(ids), len(ids)
+
+    def _reconcile_chunk(self, cursor, job, last_id):
+        """Checks the enrollments with ids in (last_id, last_id + batch_size]."""
+        upper = last_id + self.batch_size
+        # Link rows still missing a course_id by title, as the backfill migration
+        # does; only those whose title matches no course are orphans.
+        cursor.execute("""
+            UPDATE user_courses uc
+            JOIN courses.courseinfo c ON c.title = uc.course_title
+            SET uc.course_id = c.id
+            WHERE uc.id > %s AND uc.id <= %s AND uc.course_id IS NULL
+        """, (last_id, upper))
+        self.rows['course_ids_backfilled'] += cursor.rowcount
+        cursor.execute("""
+            SELECT uc.id, c.id AS course_id, c.title
+            FROM user_courses uc
+            LEFT JOIN courses.courseinfo c ON c.id = uc.course_id
+            WHERE uc.id > %s AND uc.id <= %s AND (c.id IS NULL OR c.title <> uc.course_title)
+        """, (last_id, upper))
+        rows = cursor.fetchall()
+        orphans = [row['id'] for row in rows if row['course_id'] is None]
+        stale = [(row['title'], row['id']) for row in rows if row['course_id'] is not None]
+        if orphans:
+            cursor.execute(f"DELETE FROM user_courses WHERE id IN ({', '.join(['%s'] * len(orphans))})", orphans)
+            self.rows['orphans_removed'] += len(orphans)
+        if stale:
+            cursor.executemany("UPDATE user_courses SET course_title = %s WHERE id = %s", stale)
+            self.rows['titles_repaired'] += len(stale)
+        cursor.execute("SELECT COALESCE(MAX(id), 0) AS max_id FROM user_courses")
+        if upper < cursor.fetchone()['max_id']:
+            return upper, len(rows)
+        cursor.execute("DELETE FROM enrollment_counts WHERE course_id NOT IN (SELECT id FROM courses.courseinfo)")
+        self.rows['counters_removed'] += cursor.rowcount
+        return None, len(rows)
+
+    def recent_jobs(self, limit=20):
+        """Returns the latest jobs, newest first, for progress reports."""
+        with self.db_manager.get_connection('users', readonly=True) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT id, kind, old_title, new_title, status, processed, error, created_at
+                    FROM maintenance_jobs ORDER BY id DESC LIMIT %s
+                """, (limit,))
+                return cursor.fetchall()
+
+    def samples(self):
+        """(name, labels, value) gauge samples for RequestMetrics.add_collector."""
+        yield "maintenance_jobs_done_total", {}, self.jobs_done
+        yield "maintenance_jobs_failed_total", {}, self.jobs_failed
+        yield "maintenance_jobs_pending", {}, self.pending_jobs
+        yield "maintenance_last_run_timestamp", {}, self.last_run
+        for action, count in sorted(self.rows.items()):
+            yield "maintenance_rows_total", {'action': action}, count
@@ -0,0 +1,136 @@
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request, session
+from markupsafe import Markup
+
+try:
+    import brotli
+except ImportError:  # Brotli variants are optional; gzip ones are always stored.
+    brotli = None
+
+
+class PageCache:
+    """Byte-bounded LRU of rendered pages and template fragments.
+
+    Every lookup passes the catalog version the output depends on; the first
+    lookup with a new version drops all entries, and entries also expire after
+    ttl seconds. Pages are stored with their gzip (and brotli) encodings made
+    once, so a hit costs neither rendering nor compression, and they carry an
+    ETag so a revalidating browser gets a 304 with no body.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, ttl=60, min_compress_size=1024):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.min_compress_size = min_compress_size
+        self._entries = OrderedDict()  # key -> (entry, size, expires_at)
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def _get(self, key, version):
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._bytes = 0
+                self._version = version
+            cached = self._entries.get(key)
+            if cached is not None and cached[2] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[0]
+            if cached is not None:
+                del self._entries[key]
+                self._bytes -= cached[1]
+            self.misses += 1
+            return None
+
+    def _set(self, key, version, entry, size):
+        with self._lock:
+            # The catalog changed while this was being rendered.
+            if version != self._version:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (entry, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def fragment(self, key, version, render):
+        """Returns the cached markup for key, calling render() to produce it on a miss."""
+        markup = self._get(('fragment', key), version)
+        if markup is None:
+            markup = Markup(render())
+            self._set(('fragment', key), version, markup, len(markup))
+        return markup
+
+    def _page_entry(self, body):
+        variants = {}
+        if len(body) >= self.min_compress_size:
+            variants['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                variants['br'] = brotli.compress(body, mode=brotli.MODE_TEXT)
+        return {'body': body, 'etag': hashlib.sha1(body).hexdigest(), 'variants': variants}
+
+    def _respond(self, entry):
+        encoding = next((name for name in ('br', 'gzip')
+                         if name in entry['variants'] and request.accept_encodings[name]), None)
+        response = Response(entry['variants'][encoding] if encoding else entry['body'], mimetype='text/html')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.update(('Accept-Encoding', 'Cookie'))
+        response.set_etag(f"{entry['etag']}-{encoding}" if encoding else entry['etag'])
+        # Browsers keep the page but revalidate it on every visit; unchanged pages cost a 304.
+        response.cache_control.no_cache = True
+        response.make_conditional(request)
+        if response.status_code == 304:
+            self.not_modified += 1
+        return response
+
+    def cached(self, key, version):
+        """Decorator serving a view's GET responses from the cache.
+
+        key(**view_args) returns the cache key for the current request, or None
+        to run the view uncached; version() returns the current catalog version.
+        Only 200 text/html responses that leave the session untouched are stored.
+        Pages never render flash messages, so pending ones do not bypass the cache.
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                cache_key = key(**kwargs) if request.method in ('GET', 'HEAD') else None
+                if cache_key is None:
+                    return f(*args, **kwargs)
+                current = version()
+                entry = self._get(('page', cache_key), current)
+                if entry is None:
+                    response = make_response(f(*args, **kwargs))
+                    if response.status_code != 200 or response.mimetype != 'text/html' or session.modified:
+                        return response
+                    entry = self._page_entry(response.get_data())
+                    size = len(entry['body']) + sum(len(variant) for variant in entry['variants'].values())
+                    self._set(('page', cache_key), current, entry, size)
+                return self._respond(entry)
+            return decorated_function
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'not_modified': self.not_modified,
+                    'entries': len(self._entries), 'bytes': self._bytes}
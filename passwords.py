@@ -0,0 +1,137 @@
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Stored hashes are versioned by their prefix:
+#   scrypt$<n>$<r>$<p>$<salt>$<hash>
+#   pbkdf2_sha256$<iterations>$<salt>$<hash>
+# Anything else of 64 hex characters is a legacy unsalted SHA-256 digest.
+SCRYPT = "scrypt"
+PBKDF2 = "pbkdf2_sha256"
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p, dklen=32)
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+
+
+def _is_legacy_sha256(stored):
+    return len(stored) == 64 and all(c in "0123456789abcdef" for c in stored)
+
+
+class PasswordHasher:
+    """Salted, tunable password hashing with transparent legacy upgrade.
+
+    workers > 0 runs the key derivation in a process pool so that slow hashes do
+    not hold the GIL on the request thread.
+    """
+
+    def __init__(self, algorithm=SCRYPT, scrypt_n=2 ** 14, scrypt_r=8, scrypt_p=1,
+                 pbkdf2_iterations=600_000, salt_size=16, workers=0):
+        if algorithm not in (SCRYPT, PBKDF2):
+            raise ValueError(f"Unsupported password hash algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.scrypt_n = scrypt_n
+        self.scrypt_r = scrypt_r
+        self.scrypt_p = scrypt_p
+        self.pbkdf2_iterations = pbkdf2_iterations
+        self.salt_size = salt_size
+        self.workers = workers
+        self._executor = None
+
+    def _derive(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor.submit(func, *args).result()
+
+    def hash(self, password):
+        salt = os.urandom(self.salt_size)
+        if self.algorithm == SCRYPT:
+            digest = self._derive(_scrypt, password, salt, self.scrypt_n, self.scrypt_r, self.scrypt_p)
+            return f"{SCRYPT}${self.scrypt_n}${self.scrypt_r}${self.scrypt_p}${_b64encode(salt)}${_b64encode(digest)}"
+        digest = self._derive(_pbkdf2, password, salt, self.pbkdf2_iterations)
+        return f"{PBKDF2}${self.pbkdf2_iterations}${_b64encode(salt)}${_b64encode(digest)}"
+
+    def verify(self, password, stored):
+        if not password or not stored:
+            return False
+        if _is_legacy_sha256(stored):
+            return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+        parts = stored.split("$")
+        try:
+            if parts[0] == SCRYPT and len(parts) == 6:
+                n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+                digest = self._derive(_scrypt, password, _b64decode(parts[4]), n, r, p)
+                return hmac.compare_digest(digest, _b64decode(parts[5]))
+            if parts[0] == PBKDF2 and len(parts) == 4:
+                digest = self._derive(_pbkdf2, password, _b64decode(parts[2]), int(parts[1]))
+                return hmac.compare_digest(digest, _b64decode(parts[3]))
+        except ValueError:
+            return False
+        return False
+
+    def needs_rehash(self, stored):
+        """True when stored was produced by a different algorithm or cost than the current settings."""
+        parts = stored.split("$")
+        if self.algorithm == SCRYPT:
+            return parts[0] != SCRYPT or parts[1:4] != [str(self.scrypt_n), str(self.scrypt_r), str(self.scrypt_p)]
+        return parts[0] != PBKDF2 or parts[1:2] != [str(self.pbkdf2_iterations)]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def benchmark(seconds=1.0, workers=0):
+    """Prints hashes/sec for each cost setting so worker counts can be sized."""
+    settings = [
+        ("scrypt n=2^13", PasswordHasher(SCRYPT, scrypt_n=2 ** 13, workers=workers)),
+        ("scrypt n=2^14", PasswordHasher(SCRYPT, scrypt_n=2 ** 14, workers=workers)),
+        ("scrypt n=2^15", PasswordHasher(SCRYPT, scrypt_n=2 ** 15, workers=workers)),
+        ("pbkdf2 100k", PasswordHasher(PBKDF2, pbkdf2_iterations=100_000, workers=workers)),
+        ("pbkdf2 300k", PasswordHasher(PBKDF2, pbkdf2_iterations=300_000, workers=workers)),
+        ("pbkdf2 600k", PasswordHasher(PBKDF2, pbkdf2_iterations=600_000, workers=workers)),
+    ]
+    print(f"{'setting':<16}{'hashes/sec':>12}{'ms/hash':>10}")
+    for name, hasher in settings:
+        count = 0
+        started = time.perf_counter()
+        if workers:
+            # Issue one hash per pool worker concurrently so the result reflects pool throughput.
+            with ThreadPoolExecutor(max_workers=workers) as threads:
+                while time.perf_counter() - started < seconds:
+                    list(threads.map(lambda _: hasher.hash("Benchmark123"), range(workers)))
+                    count += workers
+        else:
+            while time.perf_counter() - started < seconds:
+                hasher.hash("Benchmark123")
+                count += 1
+        elapsed = time.perf_counter() - started
+        hasher.close()
+        print(f"{name:<16}{count / elapsed:>12.1f}{elapsed / count * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark password hashing cost settings.")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time spent on each setting")
+    parser.add_argument("--workers", type=int, default=0, help="hash in a process pool of this size")
+    args = parser.parse_args()
+    benchmark(seconds=args.seconds, workers=args.workers)
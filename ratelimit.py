@@ -0,0 +1,156 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+
+def _take(tokens, updated_at, now, rate, burst):
+    """Refills a token bucket up to now and takes one token; returns (tokens, retry_after)."""
+    tokens = min(burst, tokens + (now - updated_at) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryRateLimitStore:
+    """Token buckets in a bounded in-process LRU; each worker process counts on its own.
+
+    When max_keys is exceeded the least recently used bucket is dropped. That
+    bucket has had the longest to refill, so forgetting it rarely lets anyone
+    through early.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, now):
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (burst, now))
+            tokens, retry_after = _take(tokens, updated_at, now, rate, burst)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteRateLimitStore:
+    """Token buckets in a local SQLite file, shared by all workers on one host.
+
+    Buckets untouched for max_idle seconds are deleted every purge_every takes;
+    keep max_idle at least as long as the longest limit period.
+    """
+
+    def __init__(self, path, max_idle=3600, purge_every=1000):
+        self.path = path
+        self.max_idle = max_idle
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._ready = False
+        self._ready_lock = threading.Lock()
+        self._takes = 0
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if not self._ready:
+                self._create_table()
+            # Autocommit mode, so take() can hold BEGIN IMMEDIATE across its read and write.
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_table(self):
+        with self._ready_lock:
+            if self._ready:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with sqlite3.connect(self.path, timeout=5) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS rate_limits (
+                        key TEXT PRIMARY KEY,
+                        tokens REAL NOT NULL,
+                        updated_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_rate_limits_updated_at ON rate_limits (updated_at)")
+            conn.close()
+            self._ready = True
+
+    def take(self, key, rate, burst, now):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            tokens, retry_after = _take(*(row or (burst, now)), now, rate, burst)
+            conn.execute("INSERT OR REPLACE INTO rate_limits (key, tokens, updated_at) VALUES (?, ?, ?)",
+                         (key, tokens, now))
+            self._takes += 1
+            if self._takes % self.purge_every == 0:
+                conn.execute("DELETE FROM rate_limits WHERE updated_at < ?", (now - self.max_idle,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return retry_after
+
+    def reset(self, key):
+        self._connection().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+
+class RateLimiter:
+    """Named token-bucket limits over a shared store.
+
+    limits maps a name to (attempts, period): each key under that name may make
+    attempts requests in a burst, refilled evenly over period seconds.
+    """
+
+    def __init__(self, limits, store=None):
+        self.limits = dict(limits)
+        self.store = store if store is not None else MemoryRateLimitStore()
+        self.allowed = Counter()
+        self.rejected = Counter()
+
+    def hit(self, name, key):
+        """Counts an attempt; returns 0 if it is allowed, else the seconds until the next one is."""
+        attempts, period = self.limits[name]
+        retry_after = self.store.take(f"{name}:{key}", attempts / period, attempts, time.time())
+        (self.rejected if retry_after else self.allowed)[name] += 1
+        return retry_after
+
+    def check(self, *attempts):
+        """Counts an attempt under each (name, key) pair in turn and stops at the first limit exceeded.
+
+        Returns the seconds until that limit allows another attempt, or 0.
+        """
+        for name, key in attempts:
+            retry_after = self.hit(name, key)
+            if retry_after:
+                return retry_after
+        return 0
+
+    def reset(self, name, key):
+        self.store.reset(f"{name}:{key}")
+
+    def samples(self):
+        """(name, labels, value) gauge samples for RequestMetrics.add_collector."""
+        for name in self.limits:
+            yield "rate_limit_allowed_total", {'limit': name}, self.allowed[name]
+            yield "rate_limit_rejected_total", {'limit': name}, self.rejected[name]
+        yield "rate_limit_buckets", {}, len(self.store)
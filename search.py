@@ -0,0 +1,141 @@
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9#+]*")
+TITLE_WEIGHT = 3.0
+MAX_PREFIX_EXPANSIONS = 50
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+class CourseSearchIndex:
+    """In-memory inverted index over course titles and descriptions.
+
+    Postings map each token to {title: weight}; title tokens weigh more than
+    description tokens. A sorted token list answers prefix queries with bisect,
+    so a lookup touches only the postings of the matching tokens.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)
+        self._doc_tokens = {}
+        self._tokens = []
+        self._titles = []
+        self.built = False
+
+    def rebuild(self, courses):
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._doc_tokens = {}
+            self._tokens = []
+            self._titles = []
+            for course in courses:
+                self._add(course['title'], course.get('description'))
+            self._tokens.sort()
+            self.built = True
+
+    def add(self, title, description):
+        with self._lock:
+            self._remove(title)
+            self._add(title, description, keep_sorted=True)
+
+    def remove(self, title):
+        with self._lock:
+            self._remove(title)
+
+    def _add(self, title, description, keep_sorted=False):
+        weights = defaultdict(float)
+        for token in tokenize(title):
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(description):
+            weights[token] += 1.0
+        for token, weight in weights.items():
+            postings = self._postings[token]
+            if not postings:
+                if keep_sorted:
+                    insort(self._tokens, token)
+                else:
+                    self._tokens.append(token)
+            postings[title] = weight
+        self._doc_tokens[title] = set(weights)
+        insort(self._titles, (title.lower(), title))
+
+    def _remove(self, title):
+        tokens = self._doc_tokens.pop(title, None)
+        if tokens is None:
+            return
+        for token in tokens:
+            postings = self._postings[token]
+            postings.pop(title, None)
+            if not postings:
+                del self._postings[token]
+                position = bisect_left(self._tokens, token)
+                if position < len(self._tokens) and self._tokens[position] == token:
+                    del self._tokens[position]
+        entry = (title.lower(), title)
+        position = bisect_left(self._titles, entry)
+        if position < len(self._titles) and self._titles[position] == entry:
+            del self._titles[position]
+
+    def _expand_prefix(self, prefix):
+        start = bisect_left(self._tokens, prefix)
+        matches = []
+        for token in self._tokens[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not token.startswith(prefix):
+                break
+            matches.append(token)
+        return matches
+
+    def search(self, query, limit=10):
+        """Returns titles ranked by tf-idf; the last query term also matches as a prefix."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            total = len(self._doc_tokens) or 1
+            scores = defaultdict(float)
+            matched_terms = defaultdict(int)
+            for position, term in enumerate(terms):
+                if position == len(terms) - 1:
+                    candidates = self._expand_prefix(term)
+                else:
+                    candidates = [term] if term in self._postings else []
+                seen = set()
+                for token in candidates:
+                    postings = self._postings[token]
+                    idf = math.log(1 + total / len(postings))
+                    # Exact matches outrank prefix completions of the same term.
+                    boost = 1.0 if token == term else 0.5
+                    for title, weight in postings.items():
+                        scores[title] += weight * idf * boost
+                        seen.add(title)
+                for title in seen:
+                    matched_terms[title] += 1
+            return heapq.nsmallest(limit, scores, key=lambda title: (-matched_terms[title], -scores[title], title))
+
+    def autocomplete(self, prefix, limit=8):
+        """Returns titles starting with prefix, then titles containing a word starting with it."""
+        prefix = (prefix or "").strip().lower()
+        if not prefix:
+            return []
+        with self._lock:
+            start = bisect_left(self._titles, (prefix,))
+            suggestions = []
+            for lowered, title in self._titles[start:]:
+                if not lowered.startswith(prefix) or len(suggestions) >= limit:
+                    break
+                suggestions.append(title)
+            if len(suggestions) < limit:
+                for title in self.search(prefix, limit=limit * 2):
+                    if title not in suggestions:
+                        suggestions.append(title)
+                    if len(suggestions) >= limit:
+                        break
+            return suggestions
@@ -0,0 +1,290 @@
+import copy
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+serializer = TaggedJSONSerializer()
+logger = logging.getLogger(__name__)
+
+
+class SQLiteSessionStore:
+    """Session records in a local SQLite file, shared by all workers on one host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # The file and table are created on first use rather than when the app is imported.
+            if not self._ready:
+                self._create_table()
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_table(self):
+        with self._ready_lock:
+            if self._ready:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with sqlite3.connect(self.path, timeout=5) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS sessions (
+                        sid TEXT PRIMARY KEY,
+                        data TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)")
+            conn.close()
+            self._ready = True
+
+    def get(self, sid, version=None):
+        row = self._connection().execute(
+            "SELECT data, expires_at FROM sessions WHERE sid = ? AND expires_at > ?", (sid, time.time())
+        ).fetchone()
+        return (serializer.loads(row[0]), row[1]) if row else None
+
+    def set(self, sid, data, expires_at, version=None):
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)",
+                         (sid, serializer.dumps(data), expires_at))
+
+    def delete(self, sid):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def purge_expired(self, batch_size=500):
+        with self._connection() as conn:
+            return conn.execute(
+                "DELETE FROM sessions WHERE sid IN (SELECT sid FROM sessions WHERE expires_at <= ? LIMIT ?)",
+                (time.time(), batch_size)
+            ).rowcount
+
+
+class MySQLSessionStore:
+    """Session records in the users.sessions table, shared by workers on every host."""
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    def get(self, sid, version=None):
+        with self.db_manager.get_connection('users') as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT data, expires_at FROM sessions WHERE sid = %s AND expires_at > %s",
+                               (sid, time.time()))
+                row = cursor.fetchone()
+        return (serializer.loads(row['data']), row['expires_at']) if row else None
+
+    def set(self, sid, data, expires_at, version=None):
+        with self.db_manager.get_connection('users') as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO sessions (sid, data, expires_at) VALUES (%s, %s, %s)
+                    ON DUPLICATE KEY UPDATE data = VALUES(data), expires_at = VALUES(expires_at)
+                """, (sid, serializer.dumps(data), expires_at))
+
+    def delete(self, sid):
+        with self.db_manager.get_connection('users') as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM sessions WHERE sid = %s", (sid,))
+
+    def purge_expired(self, batch_size=500):
+        with self.db_manager.get_connection('users') as conn:
+            with conn.cursor() as cursor:
+                return cursor.execute("DELETE FROM sessions WHERE expires_at <= %s LIMIT %s", (time.time(), batch_size))
+
+
+class CachedSessionStore:
+    """In-memory LRU in front of another store; writes go through to the backend.
+
+    Entries are keyed by (sid, version). The version travels in the session
+    cookie and changes on every write, so a newer cookie never hits an older
+    copy. Deletes (logout) and replayed older cookies are only seen by the
+    worker that handled them, so an entry is served from memory for at most
+    max_age seconds before the backend is asked again.
+    """
+
+    def __init__(self, backend, max_entries=10000, max_age=5):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sid, version=None):
+        key = (sid, version)
+        now = time.time()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                entry, fresh_until = cached
+                if entry[1] > now and fresh_until > now:
+                    self._entries.move_to_end(key)
+                    return entry
+                del self._entries[key]
+        entry = self.backend.get(sid)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = (entry, time.time() + self.max_age)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def set(self, sid, data, expires_at, version=None):
+        self.backend.set(sid, data, expires_at)
+        self._remember((sid, version), (data, expires_at))
+
+    def delete(self, sid):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == sid]:
+                del self._entries[key]
+        self.backend.delete(sid)
+
+    def purge_expired(self, batch_size=500):
+        now = time.time()
+        with self._lock:
+            for key in [key for key, (entry, _) in self._entries.items() if entry[1] <= now]:
+                del self._entries[key]
+        return self.backend.purge_expired(batch_size)
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, version=0, new=False, expires_at=None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.version = version
+        self.new = new
+        self.expires_at = expires_at
+        self.modified = False
+        self.opened_identity = self.identity
+
+    @property
+    def identity(self):
+        return self.get('username'), self.get('is_admin')
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Keeps session data in a server-side store; the cookie only carries a signed session id.
+
+    Expired sessions are deleted in batches by a background thread every
+    purge_interval seconds. Sessions without a logged-in user (typically just
+    pending flash messages) live for anonymous_lifetime seconds instead of the
+    app's full session lifetime.
+    """
+
+    session_class = ServerSideSession
+
+    def __init__(self, store, purge_interval=300, purge_batch_size=500, anonymous_lifetime=600):
+        self.store = store
+        self.anonymous_lifetime = anonymous_lifetime
+        self.purge_interval = purge_interval
+        self.purge_batch_size = purge_batch_size
+        self._purger = None
+        self._purger_lock = threading.Lock()
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='server-side-session')
+
+    def _lifetime(self, app, session):
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        if 'username' not in session:
+            return min(lifetime, self.anonymous_lifetime)
+        return lifetime
+
+    def open_session(self, app, request):
+        self._start_purger()
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid, _, version = self._signer(app).unsign(cookie).decode().partition('.')
+                version = int(version)
+            except (BadSignature, ValueError):
+                sid = None
+            if sid:
+                entry = self.store.get(sid, version)
+                if entry is not None:
+                    # Copy so in-place edits never leak into the store's cached entry.
+                    return self.session_class(copy.deepcopy(entry[0]), sid=sid, version=version,
+                                              expires_at=entry[1])
+        return self.session_class(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session and not session.new and session.identity != session.opened_identity:
+            # Logging in or out moves the data to a fresh id, so an id planted in a
+            # browser before login never becomes an authenticated session.
+            self.store.delete(session.sid)
+            session.sid = secrets.token_urlsafe(32)
+            session.version = 0
+            session.new = True
+            session.expires_at = None
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        now = time.time()
+        lifetime = self._lifetime(app, session)
+        # Extend idle sessions without writing the store on every request.
+        refresh = session.expires_at is None or session.expires_at - now < lifetime / 2
+        if session.modified:
+            session.version += 1
+        if session.modified or refresh:
+            session.expires_at = now + lifetime
+            self.store.set(session.sid, dict(session), session.expires_at, session.version)
+        if session.new or refresh or session.modified:
+            response.vary.add('Cookie')
+            response.set_cookie(
+                name,
+                self._signer(app).sign(f"{session.sid}.{session.version}".encode()).decode(),
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+
+    def _start_purger(self):
+        if self._purger is not None or not self.purge_interval:
+            return
+        with self._purger_lock:
+            if self._purger is None:
+                self._purger = threading.Thread(target=self._purge_loop, name='session-purger', daemon=True)
+                self._purger.start()
+
+    def _purge_loop(self):
+        while True:
+            time.sleep(self.purge_interval)
+            try:
+                while self.store.purge_expired(self.purge_batch_size) >= self.purge_batch_size:
+                    pass
+            except Exception:
+                logger.exception("Purging expired sessions failed")
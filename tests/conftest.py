@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import SQLiteDatabaseManager  # noqa: E402
+from database import CourseManager, UserManager  # noqa: E402
+from passwords import PBKDF2, PasswordHasher  # noqa: E402
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    """The users and courses databases as SQLite files (see bench.py), at the latest migration."""
+    return SQLiteDatabaseManager(str(tmp_path))
+
+
+@pytest.fixture
+def user_manager(db_manager):
+    return UserManager(db_manager, PasswordHasher(PBKDF2, pbkdf2_iterations=1000))
+
+
+@pytest.fixture
+def course_manager(db_manager):
+    return CourseManager(db_manager)
+
+
+@pytest.fixture
+def alice(user_manager):
+    success, message = user_manager.create_user("alice1", "alice1@example.com", "Passw0rd1", "Passw0rd1", None,
+                                                "Favourite colour?", "blue")
+    assert success, message
+    return "alice1"
@@ -0,0 +1,50 @@
+import time
+
+from database import CourseManager
+
+
+def search_titles(course_manager, query, expected, timeout=5):
+    """Searches until the results match, since other processes' writes are indexed in the background."""
+    deadline = time.monotonic() + timeout
+    while True:
+        titles = [course['title'] for course in course_manager.search_courses(query)]
+        if titles == expected or time.monotonic() > deadline:
+            return titles
+        time.sleep(0.01)
+
+
+def test_bulk_import_reaches_polling_workers(db_manager):
+    worker = CourseManager(db_manager, version_check_interval=0)
+    worker.create_course('python', "Intro to Python", None, 10, "Monday")
+    assert search_titles(worker, 'python', ['python']) == ['python']
+
+    # bulk.py builds its CourseManager without a version_check_interval.
+    importer = CourseManager(db_manager)
+    assert importer.bulk_create_courses([(1, {'title': 'rust', 'description': "Intro to Rust"})]) == (1, [])
+
+    assert search_titles(worker, 'rust', ['rust']) == ['rust']
+    assert worker.autocomplete_courses('ru') == ['rust']
+
+
+def test_own_writes_do_not_rebuild_the_search_index(db_manager, monkeypatch):
+    worker = CourseManager(db_manager, version_check_interval=0)
+    worker.create_course('python', "Intro to Python", None, 10, "Monday")
+    assert search_titles(worker, 'python', ['python']) == ['python']
+    rebuilds = []
+    monkeypatch.setattr(worker.search_index, 'rebuild', rebuilds.append)
+
+    worker.create_course('rust', "Intro to Rust", None, 10, "Tuesday")
+    assert worker.rename_course('python', 'python 3')[0]
+    worker.delete_course('rust')
+
+    assert search_titles(worker, 'python', ['python 3']) == ['python 3']
+    assert worker._search_index_thread is None
+    assert rebuilds == []
+
+
+def test_reads_from_the_primary_after_a_write_are_not_writes(db_manager, course_manager):
+    course_manager.create_course('python', "Intro to Python", None, 10, "Monday")
+
+    db_manager.start_request()
+    assert course_manager.get_course('python')['title'] == 'python'
+    assert not db_manager.wrote_in_request()
@@ -0,0 +1,44 @@
+def enrolled_titles(user_manager, username):
+    return [course['title'] for course in user_manager.get_enrolled_courses(username)]
+
+
+def enrollment_count(db_manager, course_manager, title):
+    course_id = course_manager.get_course(title)['id']
+    with db_manager.get_connection('users') as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT enrollments FROM enrollment_counts WHERE course_id = %s", (course_id,))
+            row = cursor.fetchone()
+    return row['enrollments'] if row else 0
+
+
+def test_enroll_in_new_course_reusing_a_renamed_title(db_manager, user_manager, course_manager, alice):
+    course_manager.create_course('python', "Intro", None, 10, "Monday")
+    assert user_manager.enroll_courses(alice, ['python']) == (['python'], [], [])
+
+    assert course_manager.rename_course('python', 'python 2')[0]
+    course_manager.create_course('python', "Reboot", None, 10, "Tuesday")
+
+    assert user_manager.enroll_courses(alice, ['python']) == (['python'], [], [])
+    assert sorted(enrolled_titles(user_manager, alice)) == ['python', 'python 2']
+    assert enrollment_count(db_manager, course_manager, 'python') == 1
+    assert enrollment_count(db_manager, course_manager, 'python 2') == 1
+
+
+def test_enroll_in_recreated_course_before_cleanup(db_manager, user_manager, course_manager, alice):
+    course_manager.create_course('python', "Intro", None, 10, "Monday")
+    assert user_manager.enroll_courses(alice, ['python']) == (['python'], [], [])
+
+    # The maintenance job that removes the old enrollment has not run yet.
+    course_manager.delete_course('python')
+    course_manager.create_course('python', "Reboot", None, 10, "Tuesday")
+
+    assert user_manager.enroll_courses(alice, ['python']) == (['python'], [], [])
+    assert enrolled_titles(user_manager, alice) == ['python']
+    assert enrollment_count(db_manager, course_manager, 'python') == 1
+
+
+def test_enroll_twice_reports_duplicate(db_manager, user_manager, course_manager, alice):
+    course_manager.create_course('python', "Intro", None, 10, "Monday")
+    assert user_manager.enroll_courses(alice, ['python', 'rust']) == (['python'], [], ['rust'])
+    assert user_manager.enroll_courses(alice, ['python']) == ([], ['python'], [])
+    assert enrollment_count(db_manager, course_manager, 'python') == 1
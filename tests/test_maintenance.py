@@ -0,0 +1,27 @@
+from maintenance import MaintenanceWorker
+
+
+def enrollments(db_manager, username):
+    with db_manager.get_connection('users') as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT course_title, course_id FROM user_courses WHERE username = %s ORDER BY id",
+                           (username,))
+            return [(row['course_title'], row['course_id']) for row in cursor.fetchall()]
+
+
+def test_reconcile_backfills_course_ids_before_removing_orphans(db_manager, user_manager, course_manager, alice):
+    course_manager.create_course('python', "Intro", None, 10, "Monday")
+    course_id = course_manager.get_course('python')['id']
+    assert user_manager.enroll_courses(alice, ['python']) == (['python'], [], [])
+    with db_manager.get_connection('users') as conn:
+        with conn.cursor() as cursor:
+            # Rows written before the backfill migration, or by an old release mid-deploy.
+            cursor.execute("UPDATE user_courses SET course_id = NULL WHERE username = %s", (alice,))
+            cursor.execute("INSERT INTO user_courses (username, course_title) VALUES (%s, %s)", (alice, 'cobol'))
+
+    worker = MaintenanceWorker(db_manager, pause=0)
+    assert worker.run_once() == 1
+
+    assert enrollments(db_manager, alice) == [('python', course_id)]
+    assert worker.rows['course_ids_backfilled'] == 1
+    assert worker.rows['orphans_removed'] == 1
@@ -0,0 +1,36 @@
+from flask import Flask, flash
+
+from pagecache import PageCache
+
+
+def make_app():
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    page_cache = PageCache()
+    renders = []
+
+    @app.route('/flash')
+    def add_flash():
+        flash("Successfully logged out.", "success")
+        return 'ok'
+
+    @app.route('/')
+    @page_cache.cached(key=lambda: 'home', version=lambda: 1)
+    def home():
+        renders.append(1)
+        return '<p>home</p>'
+
+    return app, renders
+
+
+def test_pending_flash_messages_do_not_bypass_the_cache():
+    app, renders = make_app()
+    client = app.test_client()
+    client.get('/flash')
+
+    first = client.get('/')
+    second = client.get('/', headers={'If-None-Match': first.headers['ETag']})
+
+    assert first.headers['ETag']
+    assert second.status_code == 304
+    assert len(renders) == 1
@@ -0,0 +1,26 @@
+import pymysql
+import pytest
+
+from database import DatabaseManager, PoolTimeoutError
+
+
+class FailingPool:
+    def __init__(self, error):
+        self.error = error
+
+    def acquire(self):
+        raise self.error
+
+
+@pytest.mark.parametrize('error, marked_down', [
+    (PoolTimeoutError("Timed out waiting for a connection"), False),
+    (pymysql.err.OperationalError(2003, "Can't connect"), True),
+])
+def test_only_connection_failures_take_a_replica_out_of_rotation(monkeypatch, error, marked_down):
+    db_manager = DatabaseManager(replicas=['127.0.0.1:3307'], health_check_interval=0)
+    monkeypatch.setattr(db_manager, '_get_pool', lambda database_name, replica=None: FailingPool(error))
+
+    with pytest.raises(type(error)):
+        db_manager._acquire('courses', 0)
+
+    assert db_manager.replica_status()[0]['healthy'] is not marked_down
@@ -0,0 +1,19 @@
+import time
+
+import sessions
+from sessions import CachedSessionStore, SQLiteSessionStore
+
+
+def test_logout_on_one_worker_revokes_the_session_on_others(tmp_path, monkeypatch):
+    backend = str(tmp_path / 'sessions.sqlite3')
+    worker_a = CachedSessionStore(SQLiteSessionStore(backend), max_age=5)
+    worker_b = CachedSessionStore(SQLiteSessionStore(backend), max_age=5)
+    now = time.time()
+    worker_a.set('sid', {'username': 'alice1'}, now + 3600, 1)
+    assert worker_b.get('sid', 1)[0] == {'username': 'alice1'}
+
+    worker_a.delete('sid')
+    assert worker_a.get('sid', 1) is None
+
+    monkeypatch.setattr(sessions.time, 'time', lambda: now + 6)
+    assert worker_b.get('sid', 1) is None
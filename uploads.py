@@ -0,0 +1,204 @@
+import argparse
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import abort, send_file
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it originals are served as-is.
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Content-addressed names (hex digest, optional width suffix) never change content,
+# so they can be cached by browsers and proxies for a year without revalidation.
+HASHED_FILENAME = re.compile(r'^[0-9a-f]{16,64}(_w\d+)?\.[A-Za-z0-9]+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+DEFAULT_MAX_AGE = 3600
+VARIANT_WIDTHS = (320, 640)
+VARIANT_SUFFIX = re.compile(r'_w\d+\.webp$')
+
+
+class UploadCache:
+    """Byte-bounded LRU of small upload files, validated against mtime and size."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_file_size=512 * 1024):
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self._entries = OrderedDict()  # path -> (data, etag, mtime, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, stat):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[2] == stat.st_mtime and entry[3] == stat.st_size:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        with open(path, 'rb') as f:
+            data = f.read()
+        entry = (data, hashlib.sha1(data).hexdigest(), stat.st_mtime, stat.st_size)
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[path] = entry
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted[0])
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries), 'bytes': self._bytes}
+
+
+def serve_upload(directory, filename, cache=None):
+    """Serves an uploaded file with ETag, Range and long-lived caching for hashed names.
+
+    Small files come from the in-memory cache when one is given. Larger files are
+    streamed from disk through the server's wsgi.file_wrapper (sendfile), or
+    handed to the front-end server when USE_X_SENDFILE is enabled.
+    """
+    path = safe_join(os.path.abspath(directory), filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    stat = os.stat(path)
+    immutable = bool(HASHED_FILENAME.match(filename))
+    max_age = IMMUTABLE_MAX_AGE if immutable else DEFAULT_MAX_AGE
+
+    if cache is not None and stat.st_size <= cache.max_file_size:
+        data, etag, mtime, _ = cache.get(path, stat)
+        response = send_file(io.BytesIO(data), download_name=filename, etag=etag, last_modified=mtime,
+                             max_age=max_age, conditional=True)
+    else:
+        response = send_file(path, etag=True, max_age=max_age, conditional=True)
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+
+def save_upload(file, directory):
+    """Saves an uploaded file under its content hash and returns its path.
+
+    Identical uploads share one file, and distinct files can no longer
+    overwrite each other because they happen to have the same name.
+    """
+    os.makedirs(directory, exist_ok=True)
+    extension = os.path.splitext(secure_filename(file.filename))[1].lower()
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(64 * 1024)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+        path = os.path.join(directory, digest.hexdigest()[:32] + extension)
+        if os.path.exists(path):
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return path
+
+
+def variant_filename(filename, width):
+    return f"{os.path.splitext(os.path.basename(filename))[0]}_w{width}.webp"
+
+
+class ImageProcessor:
+    """Generates resized WebP variants of uploaded images on a background thread pool."""
+
+    def __init__(self, directory, widths=VARIANT_WIDTHS, workers=2, quality=80):
+        self.directory = directory
+        self.widths = widths
+        self.quality = quality
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-variants')
+        self._known = set()
+
+    def submit(self, path):
+        if Image is None or not path:
+            return None
+        return self._executor.submit(self.process, path)
+
+    def process(self, path):
+        """Writes any missing variants of path; returns the variant filenames written."""
+        missing = [width for width in self.widths
+                   if not os.path.exists(os.path.join(self.directory, variant_filename(path, width)))]
+        if not missing:
+            return []
+        written = []
+        try:
+            with Image.open(path) as image:
+                image.load()
+                if image.mode not in ('RGB', 'RGBA'):
+                    image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+                for width in missing:
+                    variant = image.copy()
+                    # Never upscale: small originals get a same-size WebP re-encode.
+                    variant.thumbnail((width, width * 4))
+                    target = os.path.join(self.directory, variant_filename(path, width))
+                    temp_target = target + '.part'
+                    variant.save(temp_target, 'WEBP', quality=self.quality)
+                    os.replace(temp_target, target)
+                    written.append(os.path.basename(target))
+        except Exception:
+            logger.exception("Could not generate image variants for %s", path)
+        return written
+
+    def variant_for(self, path, width):
+        """Returns the filename of the width variant of path if it exists, else the original filename."""
+        if not path:
+            return ''
+        filename = os.path.basename(path)
+        variant = variant_filename(filename, width)
+        if variant in self._known:
+            return variant
+        if os.path.exists(os.path.join(self.directory, variant)):
+            self._known.add(variant)
+            return variant
+        return filename
+
+    def process_directory(self):
+        """Generates variants for every original image in the directory; returns the number written."""
+        written = 0
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if os.path.isfile(path) and not VARIANT_SUFFIX.search(name) and not name.endswith('.part'):
+                written += len(self.process(path))
+        return written
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate resized WebP variants for existing uploads.")
+    parser.add_argument('directory', nargs='?', default='uploads')
+    args = parser.parse_args()
+    if Image is None:
+        raise SystemExit("Pillow is required to generate image variants (pip install Pillow).")
+    processor = ImageProcessor(args.directory)
+    print(f"Wrote {processor.process_directory()} variants.")
+    processor.shutdown()